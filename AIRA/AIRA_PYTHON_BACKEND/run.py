@@ -1,7 +1,12 @@
 """
 Run script for AI Calling Agent
 Ensures proper Python path setup
+
+Settings come from the environment (.env); flags override them, e.g.
+    python run.py --workers 4 --limit-max-requests 5000
 """
+import argparse
+import os
 import sys
 from pathlib import Path
 
@@ -9,17 +14,71 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+
+def parse_args(settings):
+    parser = argparse.ArgumentParser(description="AI Calling Agent API server")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS,
+                        help="Worker processes (use CALL_STATE_BACKEND=sqlite with more than one)")
+    parser.add_argument("--loop", default=settings.SERVER_LOOP, choices=["auto", "uvloop", "asyncio"])
+    parser.add_argument("--http", default=settings.SERVER_HTTP, choices=["auto", "httptools", "h11"])
+    parser.add_argument("--limit-max-requests", type=int, default=settings.SERVER_LIMIT_MAX_REQUESTS,
+                        help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--drain-timeout", type=float, default=settings.SERVER_DRAIN_TIMEOUT,
+                        help="Seconds a stopping worker waits for live calls")
+    parser.add_argument("--ws-ping-interval", type=float, default=settings.WS_PING_INTERVAL)
+    parser.add_argument("--ws-ping-timeout", type=float, default=settings.WS_PING_TIMEOUT)
+    parser.add_argument("--ws-max-size", type=int, default=settings.WS_MAX_SIZE)
+    parser.add_argument("--ws-max-queue", type=int, default=settings.WS_MAX_QUEUE)
+    parser.add_argument("--backlog", type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
 # Import and run
 if __name__ == "__main__":
-    import uvicorn
-    from src.main import app
     from src.config import settings
-    
+    from src.config.settings import validate_config
+    from src.server import build_config, resolve_implementation, serve
+
+    args = parse_args(settings)
+
+    try:
+        validate_config(args.workers, args.limit_max_requests)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    # Workers read settings from the environment
+    os.environ["SERVER_WORKERS"] = str(args.workers)
+    os.environ["SERVER_LIMIT_MAX_REQUESTS"] = str(args.limit_max_requests)
+
+    config = build_config(
+        args.host,
+        args.port,
+        args.workers,
+        loop=args.loop,
+        http=args.http,
+        ws_ping_interval=args.ws_ping_interval,
+        ws_ping_timeout=args.ws_ping_timeout,
+        ws_max_size=args.ws_max_size,
+        ws_max_queue=args.ws_max_queue,
+        limit_max_requests=args.limit_max_requests,
+        backlog=args.backlog,
+        log_level=args.log_level
+    )
+
     print("\n" + "="*60)
     print("🚀 Starting AI Calling Agent API")
     print("="*60)
     print(f"Server: {settings.SERVER_URL}")
     print(f"Twilio: {settings.TWILIO_PHONE_NUMBER}")
+    print(f"Listen: {args.host}:{args.port}, {args.workers} worker(s)")
+    print(f"Loop: {resolve_implementation(args.loop, 'uvloop', 'asyncio')}, "
+          f"HTTP: {resolve_implementation(args.http, 'httptools', 'h11')}")
+    if args.limit_max_requests:
+        print(f"Recycle: every ~{args.limit_max_requests} requests (drain up to {args.drain_timeout:.0f}s)")
     print("="*60 + "\n")
-    
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+
+    serve(config, args.drain_timeout)
@@ -3,6 +3,7 @@ Configuration settings for AI Calling Agent
 """
 import os
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,6 +16,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+# REST API base (point at `python -m src.services.twilio_stub` for load tests) and its HTTP pool
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com")
+TWILIO_HTTP_MAX_CONNECTIONS = int(os.getenv("TWILIO_HTTP_MAX_CONNECTIONS", "20"))
+TWILIO_HTTP_TIMEOUT = float(os.getenv("TWILIO_HTTP_TIMEOUT", "10"))
 
 # ElevenLabs Configuration
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
@@ -25,6 +30,27 @@ ELEVENLABS_WS_URL = f"wss://api.elevenlabs.io/v1/convai/conversation?agent_id={E
 SERVER_URL = os.getenv("SERVER_URL")
 NODEJS_BACKEND_URL = os.getenv("NODEJS_BACKEND_URL", "http://localhost:5000")
 
+# Server process (run.py; CLI flags override these)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")  # auto (uvloop if installed), uvloop, asyncio
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")  # auto (httptools if installed), httptools, h11
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+# Recycle a worker after N requests (0 = never); it drains its live calls first
+SERVER_LIMIT_MAX_REQUESTS = int(os.getenv("SERVER_LIMIT_MAX_REQUESTS", "0"))
+# How long a stopping worker waits for live calls to finish before closing them
+SERVER_DRAIN_TIMEOUT = float(os.getenv("SERVER_DRAIN_TIMEOUT", "900"))
+# WebSocket limits for Twilio media streams (frames are < 1 KB, 50 per second per call)
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "20"))
+WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", "20"))
+WS_MAX_SIZE = int(os.getenv("WS_MAX_SIZE", "65536"))
+WS_MAX_QUEUE = int(os.getenv("WS_MAX_QUEUE", "64"))
+
+# One worker runs the singleton background tasks (outbox sender, dialer); leases in this file
+WORKER_LEASE_PATH = BASE_DIR / "worker_leases.db"
+WORKER_LEASE_TTL = float(os.getenv("WORKER_LEASE_TTL", "15"))
+
 # Optional Features
 HUMAN_AGENT_NUMBER = os.getenv("HUMAN_AGENT_NUMBER")
 
@@ -34,9 +60,80 @@ AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_URL")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
 AZURE_OPENAI_MODEL_NAME = os.getenv("AZURE_OPENAI_MODELNAME", "gpt-4")
 
+# Incremental extraction during live calls (update after N new turns or T seconds)
+INCREMENTAL_EXTRACTION_TURNS = int(os.getenv("INCREMENTAL_EXTRACTION_TURNS", "4"))
+INCREMENTAL_EXTRACTION_INTERVAL = float(os.getenv("INCREMENTAL_EXTRACTION_INTERVAL", "20"))
+
+# Extraction memoization cache (in-memory LRU in front of a local SQLite store)
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_PATH = BASE_DIR / "extraction_cache.db"
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "512"))
+EXTRACTION_CACHE_TTL = float(os.getenv("EXTRACTION_CACHE_TTL", "86400"))
+
+# Map-reduce extraction for long calls (estimated tokens per chunk; 0 = single request)
+EXTRACTION_CHUNK_TOKENS = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "6000"))
+EXTRACTION_MAX_CONCURRENCY = int(os.getenv("EXTRACTION_MAX_CONCURRENCY", "4"))
+
 # Recordings Directory
 RECORDINGS_DIR = BASE_DIR / "recordings"
 RECORDINGS_DIR.mkdir(exist_ok=True)
+# Per-call tracks streamed to disk while calls are live
+RECORDING_SPOOL_DIR = RECORDINGS_DIR / "tracks"
+RECORDING_SPOOL_DIR.mkdir(exist_ok=True)
+# Recording output: wav (mono mix), stereo (caller L / agent R), ulaw (stereo, no transcode), flac
+RECORDING_FORMAT = os.getenv("RECORDING_FORMAT", "wav").lower()
+
+# Post-call processing (recording mix on a process pool, I/O on a thread pool)
+POST_CALL_QUEUE_SIZE = int(os.getenv("POST_CALL_QUEUE_SIZE", "100"))
+POST_CALL_CONCURRENCY = int(os.getenv("POST_CALL_CONCURRENCY", "2"))
+POST_CALL_CPU_WORKERS = int(os.getenv("POST_CALL_CPU_WORKERS", "1"))
+POST_CALL_IO_WORKERS = int(os.getenv("POST_CALL_IO_WORKERS", "4"))
+
+# Node.js Outbox (durable queue for status updates and call data)
+NODEJS_OUTBOX_PATH = BASE_DIR / "nodejs_outbox.db"
+NODEJS_OUTBOX_BATCH_SIZE = int(os.getenv("NODEJS_OUTBOX_BATCH_SIZE", "50"))
+NODEJS_OUTBOX_MAX_BACKOFF = float(os.getenv("NODEJS_OUTBOX_MAX_BACKOFF", "300"))
+
+# Call state shared between requests (phone number per call, whisper summaries): "memory" for a
+# single worker, "sqlite" to share it between worker processes. Entries expire after their TTL.
+CALL_STATE_BACKEND = os.getenv("CALL_STATE_BACKEND", "memory").lower()
+CALL_STATE_PATH = BASE_DIR / "call_state.db"
+ACTIVE_CALL_TTL = float(os.getenv("ACTIVE_CALL_TTL", "7200"))
+CALL_SUMMARY_TTL = float(os.getenv("CALL_SUMMARY_TTL", "900"))
+# Expired call state and stale recording tracks are swept every N seconds
+CALL_STATE_SWEEP_INTERVAL = float(os.getenv("CALL_STATE_SWEEP_INTERVAL", "60"))
+RECORDING_SPOOL_MAX_AGE = float(os.getenv("RECORDING_SPOOL_MAX_AGE", "86400"))
+
+# Campaign dialer (POST /call/outbound/batch): placement rate, live-call cap and retries
+DIALER_DB_PATH = BASE_DIR / "dialer.db"
+DIALER_CALLS_PER_SECOND = float(os.getenv("DIALER_CALLS_PER_SECOND", "1"))
+DIALER_MAX_CONCURRENT_CALLS = int(os.getenv("DIALER_MAX_CONCURRENT_CALLS", "10"))
+DIALER_MAX_ATTEMPTS = int(os.getenv("DIALER_MAX_ATTEMPTS", "3"))
+DIALER_RETRY_DELAY = float(os.getenv("DIALER_RETRY_DELAY", "30"))
+DIALER_LIVE_TIMEOUT = float(os.getenv("DIALER_LIVE_TIMEOUT", "3600"))
+DIALER_MAX_BATCH_SIZE = int(os.getenv("DIALER_MAX_BATCH_SIZE", "10000"))
+
+# Pre-warm ElevenLabs sessions while outbound calls ring (unused sessions close after the TTL).
+# Single worker only: the media stream must reach the worker that placed the call.
+ELEVENLABS_PREWARM = os.getenv("ELEVENLABS_PREWARM", "false").lower() == "true"
+ELEVENLABS_PREWARM_TTL = float(os.getenv("ELEVENLABS_PREWARM_TTL", "60"))
+# Agent audio kept while ringing (the greeting); later audio said into the silence is dropped
+ELEVENLABS_PREWARM_MAX_AUDIO_MS = int(os.getenv("ELEVENLABS_PREWARM_MAX_AUDIO_MS", "10000"))
+
+# AI-initiated hang-up: end the call once the goodbye has played (Twilio marks acknowledged and no
+# new agent audio for the settle period), or after the max wait if Twilio never confirms playback
+HANGUP_SETTLE_MS = int(os.getenv("HANGUP_SETTLE_MS", "700"))
+HANGUP_MAX_WAIT = float(os.getenv("HANGUP_MAX_WAIT", "15"))
+
+# Media relay: merge caller frames into ~N ms chunks toward ElevenLabs (0 = forward every 20 ms frame)
+AUDIO_COALESCE_MS = int(os.getenv("AUDIO_COALESCE_MS", "0"))
+AUDIO_COALESCE_MAX_DELAY_MS = int(os.getenv("AUDIO_COALESCE_MAX_DELAY_MS", "120"))
+
+# Media relay send queues (frames per direction) and full-queue policy: block, drop_oldest or merge
+RELAY_ELEVENLABS_QUEUE_SIZE = int(os.getenv("RELAY_ELEVENLABS_QUEUE_SIZE", "50"))
+RELAY_ELEVENLABS_QUEUE_POLICY = os.getenv("RELAY_ELEVENLABS_QUEUE_POLICY", "merge")
+RELAY_TWILIO_QUEUE_SIZE = int(os.getenv("RELAY_TWILIO_QUEUE_SIZE", "500"))
+RELAY_TWILIO_QUEUE_POLICY = os.getenv("RELAY_TWILIO_QUEUE_POLICY", "block")
 
 # Transfer Keywords
 TRANSFER_KEYWORDS = [
@@ -46,6 +143,8 @@ TRANSFER_KEYWORDS = [
     "speak with", "talk with", "connect me", "real human",
     "actual person", "someone else", "supervisor", "manager"
 ]
+# Require keywords to match whole words ("agent" no longer matches "agenda")
+TRANSFER_MATCH_WHOLE_WORDS = os.getenv("TRANSFER_MATCH_WHOLE_WORDS", "false").lower() == "true"
 
 # Validate required environment variables
 REQUIRED_VARS = {
@@ -57,8 +156,27 @@ REQUIRED_VARS = {
     "SERVER_URL": SERVER_URL
 }
 
-def validate_config():
-    """Validate required configuration"""
+def validate_config(workers: Optional[int] = None, limit_max_requests: Optional[int] = None):
+    """
+    Validate required configuration
+
+    ``workers`` / ``limit_max_requests`` override SERVER_WORKERS / SERVER_LIMIT_MAX_REQUESTS.
+    """
     missing = [k for k, v in REQUIRED_VARS.items() if not v]
     if missing:
         raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
+
+    workers = SERVER_WORKERS if workers is None else workers
+    limit_max_requests = SERVER_LIMIT_MAX_REQUESTS if limit_max_requests is None else limit_max_requests
+    # A recycled worker drains its calls while its replacement already serves requests
+    several_processes = workers > 1 or limit_max_requests > 0
+    if several_processes and ELEVENLABS_PREWARM:
+        raise ValueError(
+            "ELEVENLABS_PREWARM=true needs a single worker without --limit-max-requests: the media "
+            "stream can land on another worker process, leaving the pre-warmed session unused"
+        )
+    if several_processes and CALL_STATE_BACKEND == "memory":
+        raise ValueError(
+            "CALL_STATE_BACKEND=memory needs a single worker without --limit-max-requests: calls "
+            "would lose their phone number and whisper summary - set CALL_STATE_BACKEND=sqlite"
+        )
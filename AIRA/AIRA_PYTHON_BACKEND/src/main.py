@@ -592,15 +592,15 @@ AI Calling Agent - Main Application
 Backend API for Twilio + ElevenLabs Integration
 """
 import asyncio
-import json
 import logging
+import os
 import sys
-import base64
-from typing import List, Dict
+import time
+from functools import partial
+from typing import List, Dict, Optional
 from datetime import datetime
 
-import websockets
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from twilio.twiml.voice_response import VoiceResponse, Connect, Stream
@@ -610,10 +610,53 @@ from .config import settings
 from .config.settings import validate_config
 
 # Import services
-from .services import extract_structured_data, save_recording, TwilioService, NodeJSIntegration
+from .services import (
+    extract_structured_data_async,
+    close_extraction_clients,
+    configure_extraction_cache,
+    extraction_cache_stats,
+    extraction_latency,
+    extraction_errors,
+    ExtractionCache,
+    save_recording,
+    CallRecorder,
+    purge_spool,
+    spool_stats,
+    recording_bytes_written,
+    IncrementalExtractor,
+    AsyncTwilioService,
+    AsyncNodeJSIntegration,
+    NodeJSOutbox,
+    CallDialer,
+    create_call_state_store,
+    ElevenLabsWarmPool,
+)
+from .models import BatchCallRequest
 
 # Import utilities
-from .utils import should_transfer, save_transcript, save_user_data, process_call_data_async, should_end_call
+from .utils import (
+    should_transfer,
+    save_transcript,
+    save_user_data,
+    process_call_data_async,
+    should_end_call,
+    PostCallJobQueue,
+    PhraseMatcher,
+    decode_twilio_message,
+    decode_elevenlabs_message,
+    user_audio_message,
+    pong_message,
+    TwilioEnvelope,
+    AudioCoalescer,
+    RelayRegistry,
+    SendQueue,
+    PlaybackTracker,
+    WorkerLease,
+    MetricsWriter,
+    METRICS_CONTENT_TYPE,
+    TurnTracer,
+    turn_latency,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -630,18 +673,121 @@ except ValueError as e:
     sys.exit(1)
 
 # Initialize services
-twilio_service = TwilioService(
+# Async Twilio REST client (pooled, never blocks live relays)
+twilio_service = AsyncTwilioService(
     settings.TWILIO_ACCOUNT_SID,
     settings.TWILIO_AUTH_TOKEN,
-    settings.TWILIO_PHONE_NUMBER
+    settings.TWILIO_PHONE_NUMBER,
+    api_base_url=settings.TWILIO_API_BASE_URL,
+    max_connections=settings.TWILIO_HTTP_MAX_CONNECTIONS,
+    timeout=settings.TWILIO_HTTP_TIMEOUT
+)
+
+# Other worker processes write to the outbox and dialer queues too; their writes cannot
+# wake this process's background tasks, so poll while more than one process may run
+background_poll_interval = 1.0 if settings.SERVER_WORKERS > 1 or settings.SERVER_LIMIT_MAX_REQUESTS else None
+
+# Async client for Node.js calls issued from the event loop (never blocks live relays)
+nodejs_async = AsyncNodeJSIntegration(settings.NODEJS_BACKEND_URL)
+# Durable outbox in front of it - updates are queued, not lost, while Node.js is down
+nodejs_outbox = NodeJSOutbox(
+    settings.NODEJS_OUTBOX_PATH,
+    nodejs_async,
+    batch_size=settings.NODEJS_OUTBOX_BATCH_SIZE,
+    max_delay=settings.NODEJS_OUTBOX_MAX_BACKOFF,
+    poll_interval=background_poll_interval
+)
+
+# Memoize extractions so retries and unchanged transcripts never hit Azure twice
+extraction_cache = ExtractionCache(
+    settings.EXTRACTION_CACHE_PATH,
+    max_entries=settings.EXTRACTION_CACHE_SIZE,
+    ttl_seconds=settings.EXTRACTION_CACHE_TTL
+) if settings.EXTRACTION_CACHE_ENABLED else None
+configure_extraction_cache(extraction_cache)
+
+# Long transcripts are extracted as parallel chunks within a token budget and merged
+chunked_extraction = partial(
+    extract_structured_data_async,
+    max_chunk_tokens=settings.EXTRACTION_CHUNK_TOKENS,
+    max_concurrency=settings.EXTRACTION_MAX_CONCURRENCY
+)
+
+# ElevenLabs sessions pre-connected while outbound calls ring (keyed by call SID)
+elevenlabs_pool = ElevenLabsWarmPool(
+    settings.ELEVENLABS_WS_URL,
+    settings.ELEVENLABS_API_KEY,
+    ttl_seconds=settings.ELEVENLABS_PREWARM_TTL,
+    max_buffered_audio_ms=settings.ELEVENLABS_PREWARM_MAX_AUDIO_MS
 )
 
-nodejs_integration = NodeJSIntegration(settings.NODEJS_BACKEND_URL)
+# Per-call relay message counters (live calls + recent history)
+relay_registry = RelayRegistry()
 
+# Transfer keywords compiled once into a single-pass matcher
+transfer_matcher = PhraseMatcher(settings.TRANSFER_KEYWORDS, whole_words=settings.TRANSFER_MATCH_WHOLE_WORDS)
+
+# Post-call processing runs off the relay event loop (process pool + thread pool)
+post_call_jobs = PostCallJobQueue(
+    process_call_data_async,
+    max_queue_size=settings.POST_CALL_QUEUE_SIZE,
+    concurrency=settings.POST_CALL_CONCURRENCY,
+    cpu_workers=settings.POST_CALL_CPU_WORKERS,
+    io_workers=settings.POST_CALL_IO_WORKERS
+)
+
+# Call state read and written by different requests (possibly on different workers)
+call_state = create_call_state_store(settings.CALL_STATE_BACKEND, settings.CALL_STATE_PATH)
 # Store active call information (callSid -> phone_number mapping)
-active_calls = {}
+active_calls = call_state.map("active_calls", ttl=settings.ACTIVE_CALL_TTL)
 # Store call transcripts/summaries prior to transfer
-call_summaries = {}
+call_summaries = call_state.map("call_summaries", ttl=settings.CALL_SUMMARY_TTL)
+
+
+async def register_outbound_call(call_sid: str, phone_number: str):
+    """Record a placed call for its stream, notify Node.js and pre-warm the agent"""
+    # Store phone number for this call
+    await active_calls.set_async(call_sid, phone_number)
+    logger.info(f"Stored phone number for call {call_sid}: {phone_number}")
+    print(f"📝 Stored: {call_sid} -> {phone_number}")
+
+    # Notify Node.js backend
+    await nodejs_outbox.update_call_status_async(call_sid, 'initiated', phone_number)
+
+    # Connect and initialise the ElevenLabs session while the phone rings
+    if settings.ELEVENLABS_PREWARM:
+        elevenlabs_pool.prewarm(call_sid)
+
+
+async def create_outbound_call(phone_number: str) -> str:
+    """Ask Twilio to place an outbound call; returns the call SID"""
+    return await twilio_service.make_outbound_call(phone_number, settings.SERVER_URL)
+
+
+async def place_outbound_call(phone_number: str) -> str:
+    """Place one outbound call and register it; returns the call SID"""
+    call_sid = await create_outbound_call(phone_number)
+    await register_outbound_call(call_sid, phone_number)
+    return call_sid
+
+
+# Bulk campaigns: rate-limited, capped at DIALER_MAX_CONCURRENT_CALLS live calls, resumable
+call_dialer = CallDialer(
+    settings.DIALER_DB_PATH,
+    create_outbound_call,
+    calls_per_second=settings.DIALER_CALLS_PER_SECOND,
+    max_concurrent_calls=settings.DIALER_MAX_CONCURRENT_CALLS,
+    max_attempts=settings.DIALER_MAX_ATTEMPTS,
+    retry_delay=settings.DIALER_RETRY_DELAY,
+    live_timeout=settings.DIALER_LIVE_TIMEOUT,
+    poll_interval=background_poll_interval,
+    on_placed=register_outbound_call
+)
+
+# With several workers, only the lease holder runs the outbox sender and the dialer
+outbox_lease = WorkerLease(settings.WORKER_LEASE_PATH, "nodejs_outbox", ttl=settings.WORKER_LEASE_TTL)
+dialer_lease = WorkerLease(settings.WORKER_LEASE_PATH, "call_dialer", ttl=settings.WORKER_LEASE_TTL)
+
 
 # Initialize FastAPI
 app = FastAPI(
@@ -675,6 +821,51 @@ else:
     print(f"⚠️  Azure OpenAI DISABLED")
 
 
+async def sweep_expired_state():
+    """Drop expired call state, cached extractions and stale recording tracks periodically"""
+    while True:
+        await asyncio.sleep(settings.CALL_STATE_SWEEP_INTERVAL)
+        try:
+            expired = await asyncio.to_thread(call_state.purge_expired)
+            if expired:
+                logger.info(f"Expired {expired} call state entries")
+            if extraction_cache:
+                purged = await asyncio.to_thread(extraction_cache.purge_expired)
+                if purged:
+                    logger.info(f"Purged {purged} expired extraction cache entries")
+            await asyncio.to_thread(purge_spool, settings.RECORDING_SPOOL_DIR, settings.RECORDING_SPOOL_MAX_AGE)
+        except Exception as e:
+            logger.error(f"Call state sweep failed: {e}")
+
+
+state_sweeper: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def startup():
+    """Start background senders (replays anything queued by a previous run)"""
+    outbox_lease.run(nodejs_outbox.start, nodejs_outbox.stop)
+    post_call_jobs.start()
+    dialer_lease.run(call_dialer.start, call_dialer.stop)
+    global state_sweeper
+    state_sweeper = asyncio.create_task(sweep_expired_state())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Finish post-call jobs, flush pending Node.js updates and close pooled clients"""
+    await dialer_lease.stop(call_dialer.stop)
+    await post_call_jobs.stop()
+    await outbox_lease.stop(nodejs_outbox.stop)
+    await nodejs_async.aclose()
+    await twilio_service.aclose()
+    await close_extraction_clients()
+    await elevenlabs_pool.close()
+    if state_sweeper:
+        state_sweeper.cancel()
+    call_state.close()
+
+
 @app.get("/")
 async def root():
     """API root endpoint"""
@@ -695,10 +886,98 @@ async def health_check():
             "human_transfer": bool(settings.HUMAN_AGENT_NUMBER),
             "data_extraction": bool(settings.AZURE_OPENAI_API_KEY and settings.AZURE_OPENAI_ENDPOINT),
             "extraction_service": "Azure OpenAI" if settings.AZURE_OPENAI_ENDPOINT else "Not configured"
+        },
+        "nodejs_outbox": await asyncio.to_thread(nodejs_outbox.stats),
+        "extraction_cache": extraction_cache_stats(),
+        "elevenlabs_pool": elevenlabs_pool.stats(),
+        "call_state": await call_state.stats_async(),
+        "recording_spool": await asyncio.to_thread(spool_stats, settings.RECORDING_SPOOL_DIR),
+        "worker": {
+            "pid": os.getpid(),
+            "live_calls": relay_registry.active_count,
+            "leases": {"nodejs_outbox": outbox_lease.held, "call_dialer": dialer_lease.held}
         }
     }
 
 
+@app.get("/jobs")
+async def list_jobs():
+    """Post-call job queue status and recent jobs"""
+    return post_call_jobs.status()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a single post-call job"""
+    job = post_call_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/relays")
+async def list_relays():
+    """Per-call media relay message rates (live and recently finished calls)"""
+    return relay_registry.snapshot()
+
+
+def collect_metrics(outbox: Dict) -> str:
+    """Prometheus exposition of this worker's counters (each worker is scraped separately)"""
+    w = MetricsWriter()
+    w.gauge("aira_active_calls", "Media streams this worker is relaying", relay_registry.active_count)
+    w.counter("aira_relayed_calls_total", "Media streams finished on this worker", relay_registry.finished_count)
+    for direction, count in relay_registry.frame_totals().items():
+        w.counter("aira_relay_frames_total", "Media frames/messages relayed, per direction (use rate() for per-second)",
+                  count, {"direction": direction})
+    depths = relay_registry.queue_depths()
+    for queue in ("elevenlabs", "twilio"):
+        w.gauge("aira_relay_queue_depth", "Messages waiting in live relays' send queues",
+                depths.get(queue, 0), {"queue": queue})
+    for queue, dropped in relay_registry.queue_drops().items():
+        w.counter("aira_relay_queue_dropped_total", "Audio frames dropped by full send queues", dropped, {"queue": queue})
+    for stage, histogram in turn_latency.items():
+        w.histogram("aira_turn_latency_seconds", "Candidate transcript to agent reply stage "
+                    "(response_text, first_audio, first_forwarded to Twilio, completed)", histogram, {"stage": stage})
+    for prewarmed, histogram in relay_registry.connect_latency.items():
+        w.histogram("aira_elevenlabs_connect_seconds", "Time to acquire the ElevenLabs session when a stream starts",
+                    histogram, {"prewarmed": str(prewarmed).lower()})
+
+    pool = elevenlabs_pool.stats()
+    w.gauge("aira_elevenlabs_prewarm_sessions", "Pre-warmed ElevenLabs sessions waiting for their call", pool["warm"])
+    w.counter("aira_elevenlabs_prewarm_hits_total", "Streams that found a pre-warmed session", pool["hits"])
+    w.counter("aira_elevenlabs_prewarm_misses_total", "Streams that had to connect on the spot", pool["misses"])
+
+    w.histogram("aira_extraction_seconds", "Azure OpenAI extraction request latency (cache hits excluded)", extraction_latency)
+    w.counter("aira_extraction_errors_total", "Failed Azure OpenAI extraction requests", extraction_errors.value)
+    cache = extraction_cache_stats()
+    if cache:
+        w.counter("aira_extraction_cache_hits_total", "Extractions served from the cache",
+                  cache["memory_hits"] + cache["disk_hits"])
+        w.counter("aira_extraction_cache_misses_total", "Extraction cache misses", cache["misses"])
+
+    jobs = post_call_jobs.status()
+    w.gauge("aira_post_call_jobs_queued", "Post-call jobs waiting for a worker", jobs["queued"])
+    w.gauge("aira_post_call_jobs_running", "Post-call jobs in progress", jobs["running"])
+    w.counter("aira_post_call_jobs_completed_total", "Post-call jobs completed", jobs["completed"])
+    w.counter("aira_post_call_jobs_failed_total", "Post-call jobs failed", jobs["failed"])
+
+    w.gauge("aira_nodejs_outbox_pending", "Node.js updates waiting for delivery", outbox["pending"])
+    w.gauge("aira_nodejs_outbox_dead", "Node.js updates given up on (dead-lettered)", outbox["dead"])
+    w.counter("aira_nodejs_outbox_delivered_total", "Node.js updates delivered by this worker", outbox["delivered"])
+    w.counter("aira_nodejs_sync_failures_total", "Failed Node.js delivery attempts by this worker",
+              outbox["failed_attempts"])
+
+    w.counter("aira_recording_bytes_written_total", "Audio bytes written to recording tracks", recording_bytes_written())
+    return w.render()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker"""
+    outbox = await asyncio.to_thread(nodejs_outbox.stats)
+    return Response(content=collect_metrics(outbox), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.post("/voice")
 async def voice_webhook(request: Request):
     """Twilio Voice Webhook - Returns TwiML"""
@@ -747,7 +1026,7 @@ async def whisper_to_hr(request: Request, original_call_sid: str = ""):
     print(f"\n🗣️ Playing whisper for HR agent...")
 
     # Use pop to retrieve and remove the summary to prevent memory leaks over time
-    summary = call_summaries.pop(original_call_sid, None)
+    summary = await call_summaries.pop_async(original_call_sid)
     if not summary:
         summary = "Incoming transfer from Divya HR executive from Kainskep Solutions. Context not available."
 
@@ -764,16 +1043,101 @@ async def media_websocket(websocket: WebSocket):
 
     elevenlabs_ws = None
     stream_sid = None
+    twilio_envelope: Optional[TwilioEnvelope] = None  # Outbound frame template, set on "start"
     call_sid = None
     to_number = None
     transfer_requested = False
 
-    # Track conversation and audio
+    # Track conversation and audio (audio is streamed to disk, not kept in memory)
     conversation: List[Dict[str, str]] = []
-    user_audio_chunks: List[bytes] = []
-    agent_audio_chunks: List[bytes] = []
+    recorder: Optional[CallRecorder] = None
     call_start_time = datetime.now()
 
+    # Twilio marks after agent audio, to know when the agent has finished speaking
+    playback = PlaybackTracker()
+    hangup_task: Optional[asyncio.Task] = None
+
+    # Relay message counters; optional merging of caller frames toward ElevenLabs
+    relay_stats = relay_registry.open("pending", settings.AUDIO_COALESCE_MS)
+    # Candidate transcript -> agent reply latency of every turn (saved with the transcript)
+    turn_tracer = TurnTracer()
+    relay_stats.turns = turn_tracer
+    coalescer = (
+        AudioCoalescer(settings.AUDIO_COALESCE_MS, settings.AUDIO_COALESCE_MAX_DELAY_MS)
+        if settings.AUDIO_COALESCE_MS > 0 else None
+    )
+    relay_stats.coalescer = coalescer
+
+    # Running structured-data state, updated in the background as turns arrive
+    extractor = IncrementalExtractor(
+        conversation,
+        settings.AZURE_OPENAI_API_KEY,
+        settings.AZURE_OPENAI_ENDPOINT,
+        settings.AZURE_OPENAI_API_VERSION,
+        settings.AZURE_OPENAI_MODEL_NAME,
+        min_new_turns=settings.INCREMENTAL_EXTRACTION_TURNS,
+        min_interval=settings.INCREMENTAL_EXTRACTION_INTERVAL,
+        max_chunk_tokens=settings.EXTRACTION_CHUNK_TOKENS
+    )
+
+    async def on_start(data: Dict):
+        """Handle Twilio's start event: identify the call and start recording"""
+        nonlocal stream_sid, call_sid, to_number, recorder, twilio_envelope
+
+        stream_sid = data.get("streamSid")
+        twilio_envelope = TwilioEnvelope(stream_sid)
+        start_data = data.get("start", {})
+        call_sid = start_data.get("callSid")
+        relay_stats.call_id = call_sid or stream_sid
+        relay_stats.stream_started()
+
+        # DEBUG: Log all Twilio data to understand what we're receiving
+        print("\n" + "="*60)
+        print("🔍 DEBUG: Twilio Start Event Data")
+        print("="*60)
+        print(f"CallSid: {call_sid}")
+        print(f"From: {start_data.get('from')}")
+        print(f"To: {start_data.get('to')}")
+        print(f"Custom Params: {start_data.get('customParameters')}")
+        print("="*60 + "\n")
+
+        # First, try to get phone number from our stored active_calls
+        to_number = await active_calls.get_async(call_sid)
+
+        if to_number:
+            print(f"✅ Found phone number in active_calls: {to_number}")
+            logger.info(f"Retrieved phone number from active_calls: {to_number}")
+        else:
+            # Fallback: Extract phone number from Twilio data
+            print("⚠️  Phone number not in active_calls, trying Twilio data...")
+            custom_params = start_data.get("customParameters", {})
+            to_number = custom_params.get("to_number")
+
+            if not to_number:
+                # Try to get from call parameters
+                to_number = start_data.get("to")  # Outbound: the number we're calling
+                if not to_number:
+                    to_number = start_data.get("from")  # Inbound: caller's number
+
+            # Clean phone number (remove 'client:' prefix if present)
+            if to_number and to_number.startswith("client:"):
+                to_number = to_number.replace("client:", "")
+
+            # If still no number, use unknown
+            if not to_number:
+                to_number = "unknown"
+                logger.warning(f"Could not extract phone number for call {call_sid}!")
+                print(f"❌ Could not find phone number for {call_sid}")
+
+        print(f"📞 Call started: {call_sid}")
+        print(f"📱 Phone: {to_number}")
+        logger.info(f"Call started - SID: {call_sid}, Phone: {to_number}")
+
+        recorder = CallRecorder(call_sid or stream_sid, settings.RECORDING_SPOOL_DIR)
+
+        # Update Node.js: call connected (queued, never blocks the relay)
+        await nodejs_outbox.update_call_status_async(call_sid, 'connected', to_number)
+
     async def transfer_call():
         """Transfer the call to human agent"""
         nonlocal transfer_requested
@@ -784,19 +1148,11 @@ async def media_websocket(websocket: WebSocket):
         try:
             transfer_requested = True
 
-            # Extract structured data to pass to the HR agent
-            print("🔄 Extracting candidate details before transfer...")
+            # Candidate details for the HR agent come from the running extraction
+            print("🔄 Collecting candidate details before transfer...")
 
-            # Run extraction in a separate thread to avoid blocking the async event loop
             try:
-                extracted = await asyncio.to_thread(
-                    extract_structured_data,
-                    conversation,
-                    settings.AZURE_OPENAI_API_KEY,
-                    settings.AZURE_OPENAI_ENDPOINT,
-                    settings.AZURE_OPENAI_API_VERSION,
-                    settings.AZURE_OPENAI_MODEL_NAME
-                )
+                extracted = await extractor.snapshot()
 
                 parts = []
                 if extracted.get("candidate_name"): parts.append(f"Name is {extracted['candidate_name']}")
@@ -807,17 +1163,17 @@ async def media_websocket(websocket: WebSocket):
                 if extracted.get("notice_period"): parts.append(f"Notice period is {extracted['notice_period']}")
 
                 if parts:
-                    call_summaries[call_sid] = f"Incoming transfer from Divya HR executive from Kainskep Solutions. Candidate details: {', '.join(parts)}."
+                    await call_summaries.set_async(call_sid, f"Incoming transfer from Divya HR executive from Kainskep Solutions. Candidate details: {', '.join(parts)}.")
                 else:
-                    call_summaries[call_sid] = "Incoming transfer. Details could not be extracted."
+                    await call_summaries.set_async(call_sid, "Incoming transfer. Details could not be extracted.")
             except Exception as e:
                 logger.error(f"Failed to extract details for transfer: {e}")
-                call_summaries[call_sid] = "Incoming transfer from Divya HR executive from Kainskep Solutions."
+                await call_summaries.set_async(call_sid, "Incoming transfer from Divya HR executive from Kainskep Solutions.")
 
             logger.info(f"Transferring call {call_sid}")
             print(f"\n🔄 Transferring to: {settings.HUMAN_AGENT_NUMBER}")
 
-            twilio_service.transfer_call(
+            await twilio_service.transfer_call(
                 call_sid,
                 f"{settings.SERVER_URL}/transfer"
             )
@@ -828,137 +1184,135 @@ async def media_websocket(websocket: WebSocket):
             logger.error(f"Transfer failed: {e}")
             print(f"❌ Transfer failed: {e}\n")
 
+    async def hang_up_after_playback():
+        """End the call once the agent's goodbye has played to the caller"""
+        detected = time.monotonic()
+        played = await playback.wait_until_played(settings.HANGUP_SETTLE_MS / 1000, settings.HANGUP_MAX_WAIT)
+        relay_stats.hangup_wait_ms = (time.monotonic() - detected) * 1000
+        relay_stats.hangup_after_playback = played
+        if not played:
+            logger.warning(f"Playback not confirmed within {settings.HANGUP_MAX_WAIT}s - ending call {call_sid}")
+        if call_sid:
+            try:
+                await twilio_service.hangup(call_sid)
+                print(f"✅ Call ended automatically ({relay_stats.hangup_wait_ms:.0f} ms after goodbye)")
+            except Exception as e:
+                logger.error(f"Failed to end call: {e}")
+
     try:
-        # Connect to ElevenLabs
-        elevenlabs_ws = await websockets.connect(
-            settings.ELEVENLABS_WS_URL,
-            extra_headers={"xi-api-key": settings.ELEVENLABS_API_KEY}
-        )
-        print("✅ ElevenLabs connected")
-
-        # Send initialization
-        await elevenlabs_ws.send(json.dumps({
-            "type": "conversation_initiation_client_data",
-            "conversation_config_override": {
-                "asr": {
-                    "quality": "high",
-                    "user_input_audio_format": "ulaw_8000"
-                },
-                "tts": {
-                    "output_format": "ulaw_8000"
-                }
-            }
-        }))
+        # Twilio sends "connected" then "start"; the ElevenLabs session belongs to
+        # the call, so identify it before connecting
+        async for message in websocket.iter_text():
+            event, data, _ = decode_twilio_message(message)
+            if event == "start":
+                await on_start(data)
+                break
+        if not stream_sid:
+            return
+
+        # Session pre-warmed by /call/outbound if there is one, else connect now
+        acquire_started = time.monotonic()
+        elevenlabs_session = await elevenlabs_pool.acquire(call_sid)
+        elevenlabs_ws = elevenlabs_session.ws
+        relay_registry.record_connect(relay_stats, elevenlabs_session.prewarmed, time.monotonic() - acquire_started)
+        print(f"✅ ElevenLabs connected{' (pre-warmed)' if elevenlabs_session.prewarmed else ''}")
         print("📤 Init sent\n")
 
+        # One bounded send queue + writer task per direction; readers never await a peer
+        to_elevenlabs = SendQueue(
+            "elevenlabs",
+            elevenlabs_ws.send,
+            user_audio_message,
+            maxsize=settings.RELAY_ELEVENLABS_QUEUE_SIZE,
+            policy=settings.RELAY_ELEVENLABS_QUEUE_POLICY
+        )
+        to_twilio = SendQueue(
+            "twilio",
+            websocket.send_text,
+            lambda payload: twilio_envelope.media(payload),
+            maxsize=settings.RELAY_TWILIO_QUEUE_SIZE,
+            policy=settings.RELAY_TWILIO_QUEUE_POLICY
+        )
+        relay_stats.queues = {"elevenlabs": to_elevenlabs, "twilio": to_twilio}
+
         async def twilio_to_elevenlabs():
             """Forward Twilio audio to ElevenLabs"""
-            nonlocal stream_sid, call_sid, to_number
 
             try:
                 async for message in websocket.iter_text():
-                    data = json.loads(message)
-                    event = data.get("event")
-
-                    if event == "start":
-                        stream_sid = data.get("streamSid")
-                        start_data = data.get("start", {})
-                        call_sid = start_data.get("callSid")
-
-                        # DEBUG: Log all Twilio data to understand what we're receiving
-                        print("\n" + "="*60)
-                        print("🔍 DEBUG: Twilio Start Event Data")
-                        print("="*60)
-                        print(f"CallSid: {call_sid}")
-                        print(f"From: {start_data.get('from')}")
-                        print(f"To: {start_data.get('to')}")
-                        print(f"Custom Params: {start_data.get('customParameters')}")
-                        print("="*60 + "\n")
-
-                        # First, try to get phone number from our stored active_calls
-                        to_number = active_calls.get(call_sid)
-
-                        if to_number:
-                            print(f"✅ Found phone number in active_calls: {to_number}")
-                            logger.info(f"Retrieved phone number from active_calls: {to_number}")
-                        else:
-                            # Fallback: Extract phone number from Twilio data
-                            print("⚠️  Phone number not in active_calls, trying Twilio data...")
-                            custom_params = start_data.get("customParameters", {})
-                            to_number = custom_params.get("to_number")
-
-                            if not to_number:
-                                # Try to get from call parameters
-                                to_number = start_data.get("to")  # Outbound: the number we're calling
-                                if not to_number:
-                                    to_number = start_data.get("from")  # Inbound: caller's number
-
-                            # Clean phone number (remove 'client:' prefix if present)
-                            if to_number and to_number.startswith("client:"):
-                                to_number = to_number.replace("client:", "")
-
-                            # If still no number, use unknown
-                            if not to_number:
-                                to_number = "unknown"
-                                logger.warning(f"Could not extract phone number for call {call_sid}!")
-                                print(f"❌ Could not find phone number for {call_sid}")
-
-                        print(f"📞 Call started: {call_sid}")
-                        print(f"📱 Phone: {to_number}")
-                        logger.info(f"Call started - SID: {call_sid}, Phone: {to_number}")
-
-                        # Update Node.js: call connected
-                        nodejs_integration.update_call_status(call_sid, 'connected', to_number)
-
-                    elif event == "media":
-                        payload = data.get("media", {}).get("payload")
-                        if payload and elevenlabs_ws:
-                            # Save user audio
-                            try:
-                                audio_data = base64.b64decode(payload)
-                                user_audio_chunks.append(audio_data)
-                            except:
-                                pass
-
-                            # Forward to ElevenLabs
-                            await elevenlabs_ws.send(json.dumps({
-                                "user_audio_chunk": payload
-                            }))
+                    event, data, media = decode_twilio_message(message)
+
+                    if event == "media":
+                        if media and elevenlabs_ws:
+                            relay_stats.twilio_frames_in += 1
+
+                            # Stream user audio to the recorder at its Twilio timeline position
+                            # (still base64 - decoded in bulk by the recorder's writer thread)
+                            if recorder:
+                                try:
+                                    recorder.add_user_audio(
+                                        media.payload,
+                                        timestamp_ms=media.timestamp_ms,
+                                        sequence_number=media.sequence_number
+                                    )
+                                except Exception:
+                                    pass
+
+                            # Forward to ElevenLabs (payload spliced in as received). When
+                            # coalescing, Twilio's steady 20 ms frames drive the flush, so the
+                            # max-delay bound is checked on every arrival.
+                            outgoing = coalescer.add(media.payload) if coalescer else [media.payload]
+                            for payload in outgoing:
+                                await to_elevenlabs.put_audio(payload)
+                                relay_stats.elevenlabs_messages_out += 1
+
+                    elif event == "mark":
+                        # Twilio finished playing everything sent before this mark
+                        playback.acknowledge(data.get("mark", {}).get("name"))
 
                     elif event == "stop":
                         logger.info("Call ended")
                         print("\n📞 Call ended")
 
-                        # Update Node.js: call completed
+                        # Send the tail of a partially merged chunk
+                        pending_audio = coalescer.flush() if coalescer else None
+                        if pending_audio and elevenlabs_ws:
+                            await to_elevenlabs.put_audio(pending_audio)
+                            relay_stats.elevenlabs_messages_out += 1
+
+                        turn_tracer.finish()
+
+                        # Update Node.js: call completed (queued, never blocks the relay)
                         if call_sid and to_number:
-                            nodejs_integration.update_call_status(call_sid, 'completed', to_number)
+                            await nodejs_outbox.update_call_status_async(call_sid, 'completed', to_number)
 
                         # Clean up active_calls
-                        if call_sid in active_calls:
-                            del active_calls[call_sid]
+                        if call_sid and await active_calls.delete_async(call_sid):
                             print(f"🗑️  Removed {call_sid} from active_calls")
 
-                        # Trigger async processing (don't wait for it)
+                        # Only the WAV header fix-up remains for the recording
+                        user_track, agent_track = (await recorder.finish()) if recorder else (None, None)
+
+                        # Queue post-call processing (runs off the relay event loop)
                         if conversation and call_sid and to_number:
-                            asyncio.create_task(
-                                process_call_data_async(
-                                    conversation,
-                                    user_audio_chunks,
-                                    agent_audio_chunks,
-                                    call_sid,
-                                    to_number,
-                                    call_start_time,
-                                    datetime.now(),
-                                    transfer_requested,
-                                    settings,
-                                    extract_structured_data,
-                                    save_recording,
-                                    save_transcript,
-                                    save_user_data,
-                                    nodejs_integration
-                                )
+                            job_id = await post_call_jobs.submit(
+                                conversation=conversation,
+                                user_track=user_track,
+                                agent_track=agent_track,
+                                call_sid=call_sid,
+                                to_number=to_number,
+                                call_start_time=call_start_time,
+                                call_end_time=datetime.now(),
+                                transfer_requested=transfer_requested,
+                                settings=settings,
+                                extract_structured_data=chunked_extraction,
+                                extractor=extractor,
+                                save_recording=save_recording,
+                                save_transcript=save_transcript,
+                                save_user_data=save_user_data,
+                                nodejs_integration=nodejs_outbox
                             )
-                            print("🔄 Processing call data in background...")
+                            print(f"🔄 Processing call data in background ({job_id})...")
 
                         break
 
@@ -967,33 +1321,40 @@ async def media_websocket(websocket: WebSocket):
 
         async def elevenlabs_to_twilio():
             """Forward ElevenLabs audio to Twilio"""
+            nonlocal hangup_task
             try:
-                async for message in elevenlabs_ws:
-                    data = json.loads(message)
-                    msg_type = data.get("type")
-
-                    if msg_type == "conversation_initiation_metadata":
+                async for message in elevenlabs_session.messages():
+                    msg_type, data, audio_data = decode_elevenlabs_message(message)
+                    relay_stats.elevenlabs_messages_in += 1
+
+                    if msg_type == "audio":
+                        relay_stats.elevenlabs_audio_in += 1
+                        if audio_data and twilio_envelope:
+                            # Stream agent audio to the recorder
+                            if recorder:
+                                try:
+                                    recorder.add_agent_audio(audio_data)
+                                except Exception:
+                                    pass
+
+                            # Send to Twilio (payload spliced into the call's envelope by the writer)
+                            on_forwarded = turn_tracer.agent_audio()
+                            await to_twilio.put_audio(audio_data)
+                            if on_forwarded:
+                                to_twilio.on_audio_sent(on_forwarded)
+                            relay_stats.twilio_messages_out += 1
+                            relay_stats.agent_audio_sent()
+                            playback.audio_sent()
+
+                            # Closing: follow the rest of the goodbye with marks
+                            if hangup_task is not None:
+                                await to_twilio.put_message(twilio_envelope.mark(playback.next_mark()))
+
+                    elif msg_type == "conversation_initiation_metadata":
                         metadata = data.get("conversation_initiation_metadata_event", {})
                         print(f"✅ ElevenLabs initialized\n")
                         logger.info("ElevenLabs initialized")
 
-                    elif msg_type == "audio":
-                        audio_data = data.get("audio_event", {}).get("audio_base_64")
-                        if audio_data and stream_sid:
-                            # Save agent audio
-                            try:
-                                agent_audio = base64.b64decode(audio_data)
-                                agent_audio_chunks.append(agent_audio)
-                            except:
-                                pass
-
-                            # Send to Twilio
-                            await websocket.send_text(json.dumps({
-                                "event": "media",
-                                "streamSid": stream_sid,
-                                "media": {"payload": audio_data}
-                            }))
-
                     elif msg_type == "user_transcript":
                         user_event = data.get("user_transcription_event", {})
                         text = user_event.get("user_transcript", "")
@@ -1001,14 +1362,17 @@ async def media_websocket(websocket: WebSocket):
                         if text:
                             print(f"👤 Candidate: {text}")
                             logger.info(f"User: {text}")
-                            conversation.append({
+                            entry = {
                                 "role": "user",
                                 "text": text,
                                 "timestamp": datetime.now().isoformat()
-                            })
+                            }
+                            conversation.append(entry)
+                            turn_tracer.user_transcript(entry)
+                            extractor.on_turn()
 
                             # Check for transfer request
-                            if not transfer_requested and should_transfer(text, settings.TRANSFER_KEYWORDS):
+                            if not transfer_requested and should_transfer(text, transfer_matcher):
                                 print(f"🔔 Transfer request detected!")
                                 await transfer_call()
 
@@ -1018,54 +1382,65 @@ async def media_websocket(websocket: WebSocket):
                         if text:
                             print(f"🤖 AIRA: {text}")
                             logger.info(f"Agent: {text}")
+                            turn_tracer.agent_response()
                             conversation.append({
                                 "role": "agent",
                                 "text": text,
                                 "timestamp": datetime.now().isoformat()
                             })
+                            extractor.on_turn()
 
                             # Check if AI is ending the call
-                            if should_end_call(text):
+                            if hangup_task is None and should_end_call(text):
                                 print(f"\n🔔 Call completion detected! AI said goodbye.")
-                                logger.info("Call completion detected - ending call")
-
-                                # Give enough time for the complete message to be delivered
-                                # Increased from 2 to 5 seconds to ensure full statement is heard
-                                await asyncio.sleep(5)
+                                logger.info("Call completion detected - ending call after playback")
 
-                                # End the call gracefully
-                                if call_sid:
-                                    try:
-                                        twilio_service.client.calls(call_sid).update(status='completed')
-                                        print("✅ Call ended automatically")
-                                    except Exception as e:
-                                        logger.error(f"Failed to end call: {e}")
+                                # Mark the audio queued so far; the rest of the goodbye keeps
+                                # streaming (and gets marked) while the hang-up waits for playback
+                                if twilio_envelope:
+                                    await to_twilio.put_message(twilio_envelope.mark(playback.next_mark()))
+                                hangup_task = asyncio.create_task(hang_up_after_playback())
 
-                                # Break the loop to trigger cleanup
-                                break
+                    elif msg_type == "interruption":
+                        turn_tracer.interrupted()
 
                     elif msg_type == "ping":
                         event_id = data.get("ping_event", {}).get("event_id")
-                        await elevenlabs_ws.send(json.dumps({
-                            "type": "pong",
-                            "event_id": event_id
-                        }))
+                        await to_elevenlabs.put_message(pong_message(event_id))
 
             except Exception as e:
                 logger.error(f"ElevenLabs error: {e}")
 
-        # Run both directions
-        await asyncio.gather(
-            twilio_to_elevenlabs(),
-            elevenlabs_to_twilio()
-        )
+        # Run both directions. The Twilio stream ending (stop, hang-up, transfer)
+        # ends the relay; the ElevenLabs side ending alone does not, so the stop
+        # event that follows an AI-initiated hang-up is still processed.
+        writers = [asyncio.create_task(to_elevenlabs.run()), asyncio.create_task(to_twilio.run())]
+        elevenlabs_reader = asyncio.create_task(elevenlabs_to_twilio())
+        try:
+            await twilio_to_elevenlabs()
+        finally:
+            elevenlabs_reader.cancel()
+            if hangup_task is not None:
+                hangup_task.cancel()
+            to_elevenlabs.close()
+            to_twilio.close()
+            await asyncio.gather(elevenlabs_reader, *writers, *([hangup_task] if hangup_task else []), return_exceptions=True)
 
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         print(f"❌ Error: {e}")
 
     finally:
-        # Cleanup
+        # Cleanup (closes track files if the call dropped without a stop event)
+        turn_tracer.finish()
+        if recorder:
+            if conversation:
+                await recorder.finish()
+            else:
+                # Nothing was said - no post-call job will consume the tracks
+                await asyncio.to_thread(recorder.discard)
+        relay_registry.close(relay_stats)
+        logger.info(f"Relay stats: {relay_stats.as_dict()}")
         if elevenlabs_ws:
             await elevenlabs_ws.close()
         await websocket.close()
@@ -1079,18 +1454,7 @@ async def initiate_outbound_call(phone_number: str):
     For frontend integration
     """
     try:
-        call_sid = twilio_service.make_outbound_call(
-            phone_number,
-            settings.SERVER_URL
-        )
-
-        # Store phone number for this call
-        active_calls[call_sid] = phone_number
-        logger.info(f"Stored phone number for call {call_sid}: {phone_number}")
-        print(f"📝 Stored: {call_sid} -> {phone_number}")
-
-        # Notify Node.js backend
-        nodejs_integration.update_call_status(call_sid, 'initiated', phone_number)
+        call_sid = await place_outbound_call(phone_number)
 
         return {
             "success": True,
@@ -1105,6 +1469,65 @@ async def initiate_outbound_call(phone_number: str):
         }
 
 
+@app.post("/call/outbound/batch")
+async def initiate_batch_calls(batch: BatchCallRequest):
+    """
+    Queue numbers for the campaign dialer
+    Calls are placed at DIALER_CALLS_PER_SECOND with at most
+    DIALER_MAX_CONCURRENT_CALLS live at once
+    """
+    if not batch.phone_numbers:
+        raise HTTPException(status_code=400, detail="phone_numbers is empty")
+    if len(batch.phone_numbers) > settings.DIALER_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.DIALER_MAX_BATCH_SIZE} numbers per request"
+        )
+
+    result = await asyncio.to_thread(
+        call_dialer.submit,
+        batch.phone_numbers,
+        campaign_id=batch.campaign_id,
+        name=batch.name,
+        priority=batch.priority
+    )
+    logger.info(f"Campaign {result['campaign_id']}: queued {result['queued']} numbers")
+    print(f"📋 Campaign {result['campaign_id']}: {result['queued']} numbers queued")
+    return {"success": True, **result}
+
+
+@app.get("/call/outbound/batch/{campaign_id}")
+async def get_batch_campaign(campaign_id: str):
+    """Campaign progress: numbers per dial status and call outcome"""
+    campaign = await asyncio.to_thread(call_dialer.campaign, campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@app.get("/call/outbound/batch/{campaign_id}/entries")
+async def get_batch_entries(campaign_id: str, status: Optional[str] = None, limit: int = 100, offset: int = 0):
+    """Per-number dial state of a campaign"""
+    return await asyncio.to_thread(call_dialer.campaign_entries, campaign_id, status, min(limit, 1000), offset)
+
+
+@app.post("/call/outbound/batch/{campaign_id}/{action}")
+async def control_batch_campaign(campaign_id: str, action: str):
+    """Pause, resume or cancel a campaign (calls already live are not affected)"""
+    statuses = {"pause": "paused", "resume": "active", "cancel": "cancelled"}
+    if action not in statuses:
+        raise HTTPException(status_code=404, detail="Unknown action")
+    if not await asyncio.to_thread(call_dialer.set_campaign_status, campaign_id, statuses[action]):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return {"success": True, "campaign_id": campaign_id, "status": statuses[action]}
+
+
+@app.get("/dialer")
+async def dialer_status():
+    """Dialer limits, live calls and queued numbers per campaign"""
+    return await asyncio.to_thread(call_dialer.stats)
+
+
 @app.post("/status")
 async def call_status(request: Request):
     """Twilio status callback - handles call status updates"""
@@ -1130,10 +1553,21 @@ async def call_status(request: Request):
 
     mapped_status = status_map.get(call_status_value, call_status_value)
 
+    # Calls that ended without streaming never claim their pre-warmed session
+    if call_status_value in ('completed', 'busy', 'no-answer', 'failed', 'canceled'):
+        await elevenlabs_pool.discard(call_sid)
+        # Frees the call's slot if the dialer placed it
+        await asyncio.to_thread(call_dialer.call_ended, call_sid, call_status_value)
+        # Nothing reads a finished call's state any more (unanswered, failed, or an
+        # unanswered transfer whose whisper never played); don't wait for the TTL
+        if call_sid:
+            await active_calls.delete_async(call_sid)
+            await call_summaries.delete_async(call_sid)
+
     # Notify Node.js backend
     try:
-        nodejs_integration.update_call_status(call_sid, mapped_status, to_number)
-        print(f"✅ Notified Node.js: {call_sid} -> {mapped_status}")
+        await nodejs_outbox.update_call_status_async(call_sid, mapped_status, to_number)
+        print(f"📬 Queued for Node.js: {call_sid} -> {mapped_status}")
     except Exception as e:
         logger.error(f"Failed to notify Node.js: {e}")
         print(f"❌ Node.js notification failed: {e}")
@@ -1,4 +1,4 @@
 """Data models"""
-from .call_data import Message, UserData, CallSummary
+from .call_data import Message, UserData, CallSummary, BatchCallRequest
 
-__all__ = ['Message', 'UserData', 'CallSummary']
+__all__ = ['Message', 'UserData', 'CallSummary', 'BatchCallRequest']
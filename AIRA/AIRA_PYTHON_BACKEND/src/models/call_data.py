@@ -44,3 +44,11 @@ class CallSummary(BaseModel):
     transfer_number: Optional[str] = None
     structured_data: UserData
     conversation: List[Message]
+
+
+class BatchCallRequest(BaseModel):
+    """Numbers to dial as (part of) a campaign"""
+    phone_numbers: List[str]
+    campaign_id: Optional[str] = None  # Omit to start a new campaign; reuse to add numbers
+    name: Optional[str] = None
+    priority: Optional[int] = None  # Higher is dialed first (default 0)
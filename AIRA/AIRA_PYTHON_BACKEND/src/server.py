@@ -0,0 +1,213 @@
+"""
+Production server launcher
+
+Runs the app under uvicorn with one or more worker processes sharing the
+listening socket. A stopping worker (deploy, Ctrl+C, or recycled after
+``limit_max_requests``) first stops accepting connections and waits for its
+live calls to end, since uvicorn would otherwise close their media streams
+immediately. The supervisor starts a replacement as soon as a worker begins
+draining, so capacity is kept while old calls finish.
+"""
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+import random
+import signal
+import threading
+import time
+from typing import List, Optional
+
+import uvicorn
+
+logger = logging.getLogger("uvicorn.error")
+
+APP = "src.main:app"
+
+# A worker that exits this soon after starting is treated as a crash (bad config, import error)
+CRASH_WINDOW_SECONDS = 10
+MAX_CONSECUTIVE_CRASHES = 5
+
+
+def _live_calls() -> int:
+    """Media streams this worker is relaying"""
+    from .main import relay_registry
+    return relay_registry.active_count
+
+
+def resolve_implementation(choice: str, preferred: str, fallback: str) -> str:
+    """What uvicorn's "auto" resolves to (for the startup banner)"""
+    if choice != "auto":
+        return choice
+    return preferred if importlib.util.find_spec(preferred) else fallback
+
+
+def build_config(
+    host: str,
+    port: int,
+    workers: int,
+    loop: str = "auto",
+    http: str = "auto",
+    ws_ping_interval: Optional[float] = 20.0,
+    ws_ping_timeout: Optional[float] = 20.0,
+    ws_max_size: int = 65536,
+    ws_max_queue: int = 64,
+    limit_max_requests: int = 0,
+    backlog: int = 2048,
+    log_level: str = "info"
+) -> uvicorn.Config:
+    return uvicorn.Config(
+        APP,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        ws="websockets",
+        ws_ping_interval=ws_ping_interval or None,
+        ws_ping_timeout=ws_ping_timeout or None,
+        ws_max_size=ws_max_size,
+        ws_max_queue=ws_max_queue,
+        # Twilio does not negotiate compression; skip the per-frame deflate work
+        ws_per_message_deflate=False,
+        limit_max_requests=limit_max_requests or None,
+        backlog=backlog,
+        timeout_graceful_shutdown=30,
+        log_level=log_level,
+    )
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that lets live calls finish before shutting down"""
+
+    def __init__(self, config: uvicorn.Config, drain_timeout: float, draining=None):
+        super().__init__(config)
+        self.drain_timeout = drain_timeout
+        self.draining = draining  # multiprocessing.Event read by the supervisor
+
+    async def shutdown(self, sockets=None):
+        if self.draining is not None:
+            self.draining.set()
+
+        # Stop accepting first: new calls go to the other workers
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        deadline = time.monotonic() + self.drain_timeout
+        live = _live_calls()
+        if live:
+            logger.info(f"Draining {live} live call(s) before shutdown (up to {self.drain_timeout:.0f}s)")
+        while live and time.monotonic() < deadline and not self.force_exit:
+            await asyncio.sleep(1)
+            live = _live_calls()
+        if live:
+            logger.warning(f"Closing {live} live call(s) after the drain timeout")
+
+        await super().shutdown(sockets)
+
+
+def _run_worker(config: uvicorn.Config, sockets, draining, drain_timeout: float):
+    """Worker process entry point"""
+    config.configure_logging()
+    if config.limit_max_requests:
+        # Spread recycling out so workers do not all drain at once
+        config.limit_max_requests += random.randint(0, max(1, config.limit_max_requests // 10))
+    DrainingServer(config, drain_timeout, draining).run(sockets=sockets)
+
+
+class _Worker:
+    def __init__(self, process, draining):
+        self.process = process
+        self.draining = draining
+        self.started_at = time.monotonic()
+
+
+class Supervisor:
+    """
+    Keeps ``config.workers`` workers accepting connections
+
+    Workers that exit (recycled or crashed) or start draining are replaced.
+    SIGINT/SIGTERM stop all workers gracefully (each drains its calls).
+    """
+
+    def __init__(self, config: uvicorn.Config, drain_timeout: float):
+        self.config = config
+        self.drain_timeout = drain_timeout
+        self.should_exit = threading.Event()
+        self.workers: List[_Worker] = []
+        self._context = multiprocessing.get_context("spawn")
+        self._sockets = []
+        self._crashes = 0
+
+    def run(self):
+        self._sockets = [self.config.bind_socket()]
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.should_exit.set())
+
+        logger.info(f"Supervisor started with {self.config.workers} worker(s)")
+        while not self.should_exit.is_set():
+            self._maintain()
+            self.should_exit.wait(0.5)
+        self._shutdown()
+
+    def _spawn(self):
+        draining = self._context.Event()
+        process = self._context.Process(
+            target=_run_worker,
+            kwargs={
+                "config": self.config,
+                "sockets": self._sockets,
+                "draining": draining,
+                "drain_timeout": self.drain_timeout,
+            },
+        )
+        process.start()
+        self.workers.append(_Worker(process, draining))
+        logger.info(f"Started worker [{process.pid}]")
+
+    def _maintain(self):
+        for worker in list(self.workers):
+            if worker.process.is_alive():
+                continue
+            self.workers.remove(worker)
+            lifetime = time.monotonic() - worker.started_at
+            exitcode = worker.process.exitcode
+            if exitcode and lifetime < CRASH_WINDOW_SECONDS and not worker.draining.is_set():
+                self._crashes += 1
+                logger.error(f"Worker [{worker.process.pid}] crashed on startup (exit code {exitcode})")
+                if self._crashes >= MAX_CONSECUTIVE_CRASHES:
+                    logger.error("Workers keep crashing on startup - stopping")
+                    self.should_exit.set()
+                    return
+            else:
+                self._crashes = 0
+                logger.info(f"Worker [{worker.process.pid}] exited after {lifetime:.0f}s")
+
+        accepting = sum(1 for w in self.workers if not w.draining.is_set())
+        for _ in range(self.config.workers - accepting):
+            self._spawn()
+
+    def _shutdown(self):
+        logger.info("Stopping workers (live calls are drained first)")
+        for worker in self.workers:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + self.drain_timeout + 60
+        for worker in self.workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"Killing worker [{worker.process.pid}]")
+                worker.process.kill()
+                worker.process.join()
+        for sock in self._sockets:
+            sock.close()
+
+
+def serve(config: uvicorn.Config, drain_timeout: float):
+    """Run in-process for a single non-recycled worker, else under the supervisor"""
+    if config.workers > 1 or config.limit_max_requests:
+        Supervisor(config, drain_timeout).run()
+    else:
+        DrainingServer(config, drain_timeout).run()
@@ -1,7 +1,22 @@
 """Services module"""
-from .data_extraction import extract_structured_data
+from .data_extraction import (
+    extract_structured_data,
+    extract_structured_data_async,
+    close_extraction_clients,
+    configure_extraction_cache,
+    extraction_cache_stats,
+    extraction_latency,
+    extraction_errors,
+)
+from .extraction_cache import ExtractionCache
 from .audio_processing import save_recording
-from .twilio_service import TwilioService
-from .nodejs_integration import NodeJSIntegration
+from .call_recorder import CallRecorder, purge_spool, spool_stats, recording_bytes_written
+from .incremental_extraction import IncrementalExtractor
+from .twilio_service import TwilioService, AsyncTwilioService, TwilioError
+from .nodejs_integration import NodeJSIntegration, AsyncNodeJSIntegration
+from .nodejs_outbox import NodeJSOutbox
+from .call_dialer import CallDialer
+from .call_state import CallStateStore, CallStateMap, MemoryCallStateStore, SQLiteCallStateStore, create_call_state_store
+from .elevenlabs_session import ElevenLabsSession, ElevenLabsWarmPool, open_session
 
-__all__ = ['extract_structured_data', 'save_recording', 'TwilioService', 'NodeJSIntegration']
+__all__ = ['extract_structured_data', 'extract_structured_data_async', 'close_extraction_clients', 'configure_extraction_cache', 'extraction_cache_stats', 'extraction_latency', 'extraction_errors', 'ExtractionCache', 'save_recording', 'CallRecorder', 'purge_spool', 'spool_stats', 'recording_bytes_written', 'IncrementalExtractor', 'TwilioService', 'AsyncTwilioService', 'TwilioError', 'NodeJSIntegration', 'AsyncNodeJSIntegration', 'NodeJSOutbox', 'CallDialer', 'CallStateStore', 'CallStateMap', 'MemoryCallStateStore', 'SQLiteCallStateStore', 'create_call_state_store', 'ElevenLabsSession', 'ElevenLabsWarmPool', 'open_session']
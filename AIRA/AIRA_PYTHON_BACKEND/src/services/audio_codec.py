@@ -0,0 +1,64 @@
+"""
+NumPy-backed G.711 μ-law codec and mixing
+
+Replaces audioop (removed in Python 3.13). Decoding is a single table lookup
+over one contiguous buffer and mixing is done in a preallocated buffer, so
+there is no per-chunk Python loop regardless of call length.
+"""
+import numpy as np
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+ULAW_SILENCE = 0xFF  # μ-law code word that decodes to 0
+
+
+def _build_ulaw_decode_table() -> np.ndarray:
+    """G.711 μ-law -> 16-bit linear PCM for all 256 code words"""
+    codes = ~np.arange(256, dtype=np.uint8)
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = ((mantissa.astype(np.int32) << 3) + 0x84) << exponent
+    magnitude -= 0x84
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+ULAW_DECODE_TABLE = _build_ulaw_decode_table()
+
+
+def ulaw_decode(data: bytes) -> np.ndarray:
+    """Decode μ-law bytes to an int16 sample array"""
+    if not data:
+        return np.zeros(0, dtype=np.int16)
+    return ULAW_DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def pad_to(samples: np.ndarray, length: int, fill: int = 0) -> np.ndarray:
+    """Return ``samples`` padded with ``fill`` (silence) or truncated to ``length``"""
+    if len(samples) >= length:
+        return samples[:length]
+    padded = np.full(length, fill, dtype=samples.dtype)
+    padded[:len(samples)] = samples
+    return padded
+
+
+def interleave(*channels: np.ndarray) -> np.ndarray:
+    """Interleave equal-length channels into one frame buffer (L R L R ...)"""
+    frames = np.empty((len(channels[0]), len(channels)), dtype=channels[0].dtype)
+    for index, channel in enumerate(channels):
+        frames[:, index] = channel
+    return frames.ravel()
+
+
+def mix_int16(*tracks: np.ndarray) -> np.ndarray:
+    """
+    Mix int16 tracks with saturation
+
+    Shorter tracks are treated as silence-padded. Sums are accumulated in one
+    preallocated int32 buffer and clipped back to the int16 range.
+    """
+    length = max((len(t) for t in tracks), default=0)
+    mixed = np.zeros(length, dtype=np.int32)
+    for track in tracks:
+        mixed[:len(track)] += track
+    np.clip(mixed, INT16_MIN, INT16_MAX, out=mixed)
+    return mixed.astype(np.int16)
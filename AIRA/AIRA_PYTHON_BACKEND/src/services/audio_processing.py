@@ -1,116 +1,159 @@
 """
 Service for audio recording and processing
 """
-import base64
 import wave
-import audioop
+import struct
 import logging
 from pathlib import Path
-from typing import List
 from datetime import datetime
 
+import numpy as np
+
+from .audio_codec import ulaw_decode, mix_int16, pad_to, interleave, ULAW_SILENCE
+
 logger = logging.getLogger(__name__)
 
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+RECORDING_FORMATS = ("wav", "stereo", "ulaw", "flac")
+
+SAMPLE_RATE = 8000  # Twilio / ElevenLabs telephony rate
+WAVE_FORMAT_MULAW = 0x0007
+# RIFF header + 18-byte fmt chunk + fact chunk + data chunk header
+ULAW_WAV_HEADER_SIZE = 12 + (8 + 18) + (8 + 4) + 8
+
+
+def ulaw_wav_header(data_size: int, channels: int = 1) -> bytes:
+    """
+    Build a fixed-size WAV header for G.711 μ-law audio
+
+    The header is always ULAW_WAV_HEADER_SIZE bytes, so streaming writers can
+    reserve it up front and rewrite it in place once the final size is known.
+    """
+    frames = data_size // channels
+    return b''.join([
+        b'RIFF', struct.pack('<I', ULAW_WAV_HEADER_SIZE - 8 + data_size), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHHH', 18, WAVE_FORMAT_MULAW, channels, SAMPLE_RATE,
+                             SAMPLE_RATE * channels, channels, 8, 0),
+        b'fact', struct.pack('<II', 4, frames),
+        b'data', struct.pack('<I', data_size),
+    ])
+
+
+def read_ulaw_wav(path: Path) -> bytes:
+    """
+    Read the μ-law payload of a track written with ulaw_wav_header
+
+    Reads to end of file if the header was never fixed up (e.g. after a crash).
+    """
+    with open(path, 'rb') as f:
+        header = f.read(ULAW_WAV_HEADER_SIZE)
+        if len(header) < ULAW_WAV_HEADER_SIZE or header[:4] != b'RIFF' or header[-8:-4] != b'data':
+            raise ValueError(f"Not a μ-law track: {path}")
+        return f.read()
+
+
+def _load_track(track_path: Path) -> bytes:
+    """Read a recorder track, treating a missing track as silence"""
+    if not track_path or not Path(track_path).exists():
+        return b''
+    return read_ulaw_wav(Path(track_path))
+
+
+def _write_pcm_wav(filepath: Path, frames: np.ndarray, channels: int):
+    """Write interleaved int16 frames as a standard PCM WAV file"""
+    with wave.open(str(filepath), 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(SAMPLE_RATE)  # 8000 Hz (Twilio's sample rate)
+        wav_file.writeframes(frames.astype('<i2', copy=False).tobytes())
+
 
 def save_recording(
-    user_audio_chunks: List[bytes],
-    agent_audio_chunks: List[bytes],
+    user_track: Path,
+    agent_track: Path,
     phone_number: str,
     timestamp: datetime,
-    recordings_dir: Path
+    recordings_dir: Path,
+    output_format: str = "wav"
 ) -> str:
     """
-    Save mixed audio recording with both voices properly synchronized
-    User audio = Candidate voice (from Twilio)
-    Agent audio = AI voice (from ElevenLabs)
+    Save the call recording with both voices properly synchronized
+    User track = Candidate voice (from Twilio)
+    Agent track = AI voice (from ElevenLabs)
+
+    Tracks are the μ-law files streamed to disk by CallRecorder during the call.
+
+    Output formats:
+    - wav:    16-bit PCM mono, both voices mixed (default)
+    - stereo: 16-bit PCM, caller on the left channel, agent on the right
+    - ulaw:   μ-law stereo WAV written straight from the tracks (no transcode)
+    - flac:   lossless FLAC, caller left / agent right (needs soundfile)
     
     Returns: filepath of saved recording
     """
     try:
-        filename = f"{phone_number}_{timestamp.strftime('%Y%m%d_%H%M%S')}.wav"
+        if output_format not in RECORDING_FORMATS:
+            logger.warning(f"Unknown recording format '{output_format}', using wav")
+            output_format = "wav"
+        if output_format == "flac" and not SOUNDFILE_AVAILABLE:
+            logger.warning("soundfile not installed - saving stereo WAV instead of FLAC")
+            output_format = "stereo"
+
+        extension = "flac" if output_format == "flac" else "wav"
+        filename = f"{phone_number}_{timestamp.strftime('%Y%m%d_%H%M%S')}.{extension}"
         filepath = recordings_dir / filename
         
-        print(f"\n🎙️  Processing audio...")
-        print(f"   User chunks: {len(user_audio_chunks)}")
-        print(f"   Agent chunks: {len(agent_audio_chunks)}")
-        
-        # Decode user audio (candidate/caller voice) - from Twilio μ-law
-        user_pcm = b''
-        for chunk in user_audio_chunks:
-            try:
-                # Twilio sends μ-law encoded audio
-                linear = audioop.ulaw2lin(chunk, 2)
-                user_pcm += linear
-            except Exception as e:
-                logger.debug(f"User audio conversion error: {e}")
-                continue
-        
-        # Decode agent audio (AI voice) - from ElevenLabs μ-law
-        agent_pcm = b''
-        for chunk in agent_audio_chunks:
-            try:
-                # ElevenLabs also sends μ-law encoded audio
-                linear = audioop.ulaw2lin(chunk, 2)
-                agent_pcm += linear
-            except Exception as e:
-                logger.debug(f"Agent audio conversion error: {e}")
-                continue
-        
-        print(f"   User PCM: {len(user_pcm)} bytes")
-        print(f"   Agent PCM: {len(agent_pcm)} bytes")
-        
-        # If we have both tracks, mix them
-        if user_pcm and agent_pcm:
-            # Make both tracks the same length by padding with silence
-            max_len = max(len(user_pcm), len(agent_pcm))
-            
-            # Ensure even length (required for 16-bit audio)
-            if max_len % 2 != 0:
-                max_len += 1
-            
-            # Pad user audio with silence if needed
-            if len(user_pcm) < max_len:
-                padding_needed = max_len - len(user_pcm)
-                user_pcm += b'\x00' * padding_needed
-            else:
-                user_pcm = user_pcm[:max_len]
-            
-            # Pad agent audio with silence if needed
-            if len(agent_pcm) < max_len:
-                padding_needed = max_len - len(agent_pcm)
-                agent_pcm += b'\x00' * padding_needed
-            else:
-                agent_pcm = agent_pcm[:max_len]
-            
-            # Mix the two audio streams by adding them together
-            try:
-                mixed_audio = audioop.add(user_pcm, agent_pcm, 2)
-                print(f"   ✅ Mixed audio: {len(mixed_audio)} bytes")
-            except Exception as e:
-                logger.warning(f"Audio mixing failed, using user audio only: {e}")
-                mixed_audio = user_pcm
-                print(f"   ⚠️  Using user audio only")
-        elif user_pcm:
-            # Only user audio available
-            mixed_audio = user_pcm
-            print(f"   ⚠️  Only user audio available")
-        elif agent_pcm:
-            # Only agent audio available
-            mixed_audio = agent_pcm
-            print(f"   ⚠️  Only agent audio available")
-        else:
+        print(f"\n🎙️  Processing audio ({output_format})...")
+        user_ulaw = _load_track(user_track)
+        agent_ulaw = _load_track(agent_track)
+        print(f"   User μ-law: {len(user_ulaw)} bytes")
+        print(f"   Agent μ-law: {len(agent_ulaw)} bytes")
+
+        if not user_ulaw and not agent_ulaw:
             # No audio at all
             logger.error("No audio data to save!")
             raise ValueError("No audio data available")
+
+        if output_format == "ulaw":
+            # Interleave the received μ-law bytes as-is, padding with μ-law silence
+            length = max(len(user_ulaw), len(agent_ulaw))
+            frames = interleave(
+                pad_to(np.frombuffer(user_ulaw, dtype=np.uint8), length, fill=ULAW_SILENCE),
+                pad_to(np.frombuffer(agent_ulaw, dtype=np.uint8), length, fill=ULAW_SILENCE)
+            )
+            with open(filepath, 'wb') as f:
+                f.write(ulaw_wav_header(frames.nbytes, channels=2))
+                f.write(frames.tobytes())
+            size = frames.nbytes
+        else:
+            # Decode each track with a single table lookup (both sides are μ-law 8000 Hz)
+            user_pcm = ulaw_decode(user_ulaw)
+            agent_pcm = ulaw_decode(agent_ulaw)
+            print(f"   User PCM: {user_pcm.nbytes} bytes")
+            print(f"   Agent PCM: {agent_pcm.nbytes} bytes")
+
+            if output_format == "wav":
+                # Pad the shorter track with silence and mix with int16 saturation
+                frames = mix_int16(user_pcm, agent_pcm)
+                _write_pcm_wav(filepath, frames, channels=1)
+                print(f"   ✅ Mixed audio: {frames.nbytes} bytes")
+            else:
+                # Keep speakers separated: caller left, agent right
+                length = max(len(user_pcm), len(agent_pcm))
+                frames = interleave(pad_to(user_pcm, length), pad_to(agent_pcm, length))
+                if output_format == "flac":
+                    soundfile.write(str(filepath), frames.reshape(-1, 2), SAMPLE_RATE, format='FLAC', subtype='PCM_16')
+                else:
+                    _write_pcm_wav(filepath, frames, channels=2)
+                print(f"   ✅ Stereo audio: {frames.nbytes} bytes")
+            size = filepath.stat().st_size
         
-        # Save as standard PCM WAV file
-        with wave.open(str(filepath), 'wb') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(8000)  # 8000 Hz (Twilio's sample rate)
-            wav_file.writeframes(mixed_audio)
-        
-        logger.info(f"Recording saved: {filepath} ({len(mixed_audio)} bytes)")
+        logger.info(f"Recording saved: {filepath} ({size} bytes)")
         print(f"   💾 Saved: {filename}")
         return str(filepath)
         
@@ -0,0 +1,482 @@
+"""
+Campaign dialer for bulk outbound calls
+
+Numbers submitted in batches are stored per campaign in a local SQLite file
+and placed by a background scheduler that respects a calls-per-second limit
+(token bucket) and a maximum number of concurrent live calls. A slot is
+freed when Twilio's status callback reports the call finished. Campaigns
+with a higher priority are dialed first; campaigns of equal priority take
+turns. The queue survives restarts: dialing resumes where it stopped.
+"""
+import asyncio
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .twilio_service import TwilioError
+
+logger = logging.getLogger(__name__)
+
+CAMPAIGN_STATUSES = ("active", "paused", "cancelled")
+_PHONE_NUMBER = re.compile(r"^\+?[0-9]{6,15}$")
+_PHONE_SEPARATORS = re.compile(r"[\s\-().]")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'active',
+    created_at REAL NOT NULL,
+    last_dialed_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS dial_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    campaign_id TEXT NOT NULL,
+    phone_number TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    call_sid TEXT,
+    outcome TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    UNIQUE (campaign_id, phone_number)
+);
+CREATE INDEX IF NOT EXISTS idx_dial_queue_status ON dial_queue (status, campaign_id, next_attempt_at, id);
+CREATE INDEX IF NOT EXISTS idx_dial_queue_call_sid ON dial_queue (call_sid);
+"""
+
+# Entry statuses: queued -> dialing -> live -> done (outcome = Twilio's final status),
+# failed when the call could not be placed after max_attempts, or review when placing it
+# failed in a way that may still have started the call (never retried automatically)
+
+
+def normalise_phone_number(number: str) -> Optional[str]:
+    """Strip separators; None if it does not look like a phone number"""
+    cleaned = _PHONE_SEPARATORS.sub("", number or "")
+    return cleaned if _PHONE_NUMBER.match(cleaned) else None
+
+
+class CallDialer:
+    """
+    Rate-limited, capacity-aware scheduler for campaign calls
+
+    ``place_call(phone_number)`` creates one call and returns its call SID;
+    ``on_placed(call_sid, phone_number)`` then registers it, once the SID is
+    stored. Only failures that cannot have started a call (connection errors,
+    Twilio 5xx and 429) are retried, with backoff up to ``max_attempts``.
+    Other Twilio 4xx errors mark the number failed; anything else, such as a
+    timeout after the request was sent, marks it for review so the candidate
+    is never dialed twice.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        place_call: Callable[[str], Awaitable[str]],
+        calls_per_second: float = 1.0,
+        max_concurrent_calls: int = 10,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+        live_timeout: float = 3600.0,
+        poll_interval: Optional[float] = None,
+        on_placed: Optional[Callable[[str, str], Awaitable[None]]] = None
+    ):
+        self.db_path = Path(db_path)
+        self.place_call = place_call
+        self.on_placed = on_placed
+        self.calls_per_second = calls_per_second
+        self.max_concurrent_calls = max_concurrent_calls
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.live_timeout = live_timeout
+        # Batches and status callbacks handled by other worker processes cannot wake the scheduler
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # Token bucket: up to one second's worth of calls may start back to back
+        self._burst = max(1.0, calls_per_second)
+        self._tokens = self._burst
+        self._refilled_at = time.monotonic()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dialing: Set[asyncio.Task] = set()
+        self._ended_early: Dict[str, str] = {}  # call_sid -> outcome, for callbacks that beat _mark_live
+        self.placed_count = 0
+        self.failed_attempts = 0
+
+    # ------------------------------------------------------------------
+    # Campaign management (safe to call from any thread)
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        phone_numbers: Iterable[str],
+        campaign_id: Optional[str] = None,
+        name: Optional[str] = None,
+        priority: Optional[int] = None
+    ) -> Dict:
+        """
+        Queue numbers for a campaign (created if new)
+
+        Numbers already queued for the campaign are skipped, so a retried
+        batch does not dial anyone twice.
+        """
+        campaign_id = campaign_id or uuid.uuid4().hex[:12]
+        valid, invalid = [], []
+        for number in phone_numbers:
+            normalised = normalise_phone_number(number)
+            (valid if normalised else invalid).append(normalised or number)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO campaigns (id, name, priority, status, created_at) VALUES (?, ?, ?, 'active', ?)",
+                    (campaign_id, name, priority or 0, now)
+                )
+                if priority is not None:
+                    self._conn.execute("UPDATE campaigns SET priority = ? WHERE id = ?", (priority, campaign_id))
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO dial_queue "
+                    "(campaign_id, phone_number, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(campaign_id, number, now, now, now) for number in valid]
+                )
+                queued = self._conn.total_changes - before
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        self._notify()
+        return {
+            "campaign_id": campaign_id,
+            "queued": queued,
+            "duplicates": len(valid) - queued,
+            "invalid": invalid,
+        }
+
+    def set_campaign_status(self, campaign_id: str, status: str) -> bool:
+        """Pause, resume (active) or cancel a campaign; calls already live are not touched"""
+        if status not in CAMPAIGN_STATUSES:
+            raise ValueError(f"Unknown campaign status: {status}")
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE campaigns SET status = ? WHERE id = ?", (status, campaign_id)
+            ).rowcount
+        if updated:
+            self._notify()
+        return bool(updated)
+
+    def call_ended(self, call_sid: str, outcome: str):
+        """A dialer call reached a terminal Twilio status: free its slot"""
+        if not call_sid:
+            return
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE dial_queue SET status = 'done', outcome = ?, updated_at = ? "
+                "WHERE call_sid = ? AND status IN ('dialing', 'live')",
+                (outcome, time.time(), call_sid)
+            ).rowcount
+            if not updated and self._dialing:
+                # The callback may arrive before place_call() has returned the SID
+                self._ended_early[call_sid] = outcome
+        if updated:
+            self._notify()
+
+    def campaign(self, campaign_id: str) -> Optional[Dict]:
+        """Campaign settings plus entry counts by status and outcome"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, name, priority, status, created_at FROM campaigns WHERE id = ?", (campaign_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            by_status = self._conn.execute(
+                "SELECT status, COUNT(*) FROM dial_queue WHERE campaign_id = ? GROUP BY status", (campaign_id,)
+            ).fetchall()
+            by_outcome = self._conn.execute(
+                "SELECT outcome, COUNT(*) FROM dial_queue WHERE campaign_id = ? AND status = 'done' GROUP BY outcome",
+                (campaign_id,)
+            ).fetchall()
+        return {
+            "campaign_id": row[0],
+            "name": row[1],
+            "priority": row[2],
+            "status": row[3],
+            "created_at": row[4],
+            "entries": {status: count for status, count in by_status},
+            "outcomes": {outcome: count for outcome, count in by_outcome},
+        }
+
+    def campaign_entries(self, campaign_id: str, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Individual numbers of a campaign with their dial state"""
+        query = (
+            "SELECT phone_number, status, call_sid, outcome, attempts, updated_at, last_error "
+            "FROM dial_queue WHERE campaign_id = ?"
+        )
+        params: List = [campaign_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY id LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        keys = ("phone_number", "status", "call_sid", "outcome", "attempts", "updated_at", "last_error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def stats(self) -> Dict:
+        """Scheduler limits, live calls and queued entries per campaign"""
+        with self._lock:
+            (live,) = self._conn.execute(
+                "SELECT COUNT(*) FROM dial_queue WHERE status IN ('dialing', 'live')"
+            ).fetchone()
+            campaigns = self._conn.execute(
+                "SELECT c.id, c.priority, c.status, COALESCE(SUM(q.status = 'queued'), 0) "
+                "FROM campaigns c LEFT JOIN dial_queue q ON q.campaign_id = c.id "
+                "GROUP BY c.id ORDER BY c.priority DESC, c.created_at"
+            ).fetchall()
+        return {
+            "calls_per_second": self.calls_per_second,
+            "max_concurrent_calls": self.max_concurrent_calls,
+            "live_calls": live,
+            "placed": self.placed_count,
+            "failed_attempts": self.failed_attempts,
+            "campaigns": [
+                {"campaign_id": cid, "priority": priority, "status": status, "queued": queued}
+                for cid, priority, status, queued in campaigns if queued or status == "active"
+            ],
+        }
+
+    # ------------------------------------------------------------------
+    # Scheduler
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the scheduler; a previous run's queue is resumed"""
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        reset = self._recover()
+        if reset:
+            logger.info(f"Dialer: re-queued {reset} numbers interrupted while dialing")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop scheduling; in-flight call placements are allowed to finish"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dialing:
+            await asyncio.wait(list(self._dialing), timeout=10)
+
+    def _notify(self):
+        """Wake the scheduler from whichever thread changed the queue"""
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass
+
+    def _take_token(self) -> float:
+        """0 if a call may start now (token taken), else seconds until one is available"""
+        now = time.monotonic()
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self.calls_per_second)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.calls_per_second
+
+    async def _run(self):
+        while True:
+            try:
+                delay = await self._dispatch()
+                if self.poll_interval:
+                    delay = min(delay, self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Dialer error: {e}")
+                delay = 1.0
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self) -> float:
+        """Start calls while rate and capacity allow; returns seconds to wait"""
+        while True:
+            wait = self._take_token()
+            if wait:
+                return wait
+            entry, delay = await asyncio.to_thread(self._claim_next)
+            if entry is None:
+                self._tokens = min(self._burst, self._tokens + 1)  # Nothing dialed, give the token back
+                return delay
+            task = asyncio.create_task(self._dial(*entry))
+            self._dialing.add(task)
+            task.add_done_callback(self._dial_done)
+
+    def _dial_done(self, task: asyncio.Task):
+        self._dialing.discard(task)
+        if not self._dialing:
+            # Early callbacks are only needed while a placement is in flight
+            with self._lock:
+                self._ended_early.clear()
+
+    async def _dial(self, entry_id: int, phone_number: str, attempts: int):
+        try:
+            call_sid = await self.place_call(phone_number)
+        except Exception as e:
+            self.failed_attempts += 1
+            status = _failure_status(e)
+            if status == "review":
+                logger.error(f"Dialer: call to {phone_number} may have been placed, not retrying: {e}")
+            else:
+                logger.warning(f"Dialer: call to {phone_number} failed (attempt {attempts + 1}): {e}")
+            await asyncio.to_thread(self._record_failure, entry_id, attempts + 1, str(e) or e.__class__.__name__, status)
+            self._notify()
+            return
+        self.placed_count += 1
+        # Store the SID first: whatever happens next, this number is not dialed again
+        await asyncio.to_thread(self._mark_live, entry_id, call_sid)
+        if self.on_placed:
+            try:
+                await self.on_placed(call_sid, phone_number)
+            except Exception as e:
+                logger.error(f"Dialer: registering call {call_sid} to {phone_number} failed: {e}")
+
+    # ------------------------------------------------------------------
+    # SQLite helpers (run in worker threads)
+    # ------------------------------------------------------------------
+
+    def _recover(self) -> int:
+        """Re-queue numbers whose placement was interrupted (no call SID recorded)"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE dial_queue SET status = 'queued', updated_at = ? WHERE status = 'dialing' AND call_sid IS NULL",
+                (time.time(),)
+            ).rowcount
+
+    def _claim_next(self) -> Tuple[Optional[Tuple[int, str, int]], float]:
+        """
+        Reserve the next number if a live-call slot is free
+
+        Returns ((id, phone_number, attempts), 0) or (None, seconds to wait).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Calls whose final status callback never arrived must not hold a slot forever
+                self._conn.execute(
+                    "UPDATE dial_queue SET status = 'done', outcome = 'unknown', last_error = 'no final status', "
+                    "updated_at = ? WHERE status IN ('dialing', 'live') AND updated_at < ?",
+                    (now, now - self.live_timeout)
+                )
+                (live,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM dial_queue WHERE status IN ('dialing', 'live')"
+                ).fetchone()
+                if live >= self.max_concurrent_calls:
+                    self._conn.execute("COMMIT")
+                    return None, 5.0  # call_ended() wakes the scheduler sooner
+
+                # Highest priority first; among equal priorities, the campaign dialed least recently
+                row = self._conn.execute(
+                    "SELECT q.id, q.phone_number, q.attempts, q.campaign_id FROM dial_queue q "
+                    "JOIN campaigns c ON c.id = q.campaign_id "
+                    "WHERE q.status = 'queued' AND c.status = 'active' AND q.next_attempt_at <= ? "
+                    "ORDER BY c.priority DESC, c.last_dialed_at, q.id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    (next_at,) = self._conn.execute(
+                        "SELECT MIN(q.next_attempt_at) FROM dial_queue q JOIN campaigns c ON c.id = q.campaign_id "
+                        "WHERE q.status = 'queued' AND c.status = 'active'"
+                    ).fetchone()
+                    self._conn.execute("COMMIT")
+                    return None, 60.0 if next_at is None else min(60.0, max(0.0, next_at - now))
+
+                entry_id, phone_number, attempts, campaign_id = row
+                self._conn.execute(
+                    "UPDATE dial_queue SET status = 'dialing', updated_at = ? WHERE id = ?", (now, entry_id)
+                )
+                self._conn.execute("UPDATE campaigns SET last_dialed_at = ? WHERE id = ?", (now, campaign_id))
+                self._conn.execute("COMMIT")
+                return (entry_id, phone_number, attempts), 0.0
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _mark_live(self, entry_id: int, call_sid: str):
+        with self._lock:
+            outcome = self._ended_early.pop(call_sid, None)
+            if outcome is None:
+                self._conn.execute(
+                    "UPDATE dial_queue SET status = 'live', call_sid = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE id = ?",
+                    (call_sid, time.time(), entry_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE dial_queue SET status = 'done', call_sid = ?, outcome = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    (call_sid, outcome, time.time(), entry_id)
+                )
+        if outcome is not None:
+            self._notify()
+
+    def _record_failure(self, entry_id: int, attempts: int, error: str, status: Optional[str]):
+        """``status`` is failed/review to stop dialing the number, None to retry while attempts remain"""
+        now = time.time()
+        if status is None and attempts >= self.max_attempts:
+            status = "failed"
+        with self._lock:
+            if status:
+                self._conn.execute(
+                    "UPDATE dial_queue SET status = ?, attempts = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                    (status, attempts, error, now, entry_id)
+                )
+            else:
+                delay = self.retry_delay * (2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                self._conn.execute(
+                    "UPDATE dial_queue SET status = 'queued', attempts = ?, last_error = ?, next_attempt_at = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (attempts, error, now + delay, now, entry_id)
+                )
+
+
+def _failure_status(error: Exception) -> Optional[str]:
+    """None if placing the call can safely be retried, else the entry's final status"""
+    if not isinstance(error, TwilioError) or error.ambiguous:
+        return "review"
+    if error.status is not None and 400 <= error.status < 500 and error.status != 429:
+        return "failed"
+    return None
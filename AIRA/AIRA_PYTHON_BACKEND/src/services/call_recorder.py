@@ -0,0 +1,312 @@
+"""
+Streaming call recorder
+
+Writes caller and agent audio to per-call μ-law track files while the call
+is live, so memory per call stays flat regardless of call length. Disk
+writes happen on a shared background thread; the event loop only appends to
+a small per-track buffer. Payloads can be handed over still base64-encoded,
+exactly as the relay received them: they are decoded by the writer thread in
+one batch per flush, not per 20 ms frame on the event loop.
+
+Both tracks share one timeline starting at the Twilio ``start`` event, so
+each chunk lands at its true offset and gaps are written as silence.
+"""
+import asyncio
+import binascii
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .audio_codec import ULAW_SILENCE
+from .audio_processing import ulaw_wav_header
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_MS = 8  # 8 kHz, one byte per μ-law sample
+_SILENCE_BLOCK = bytes([ULAW_SILENCE]) * 8000
+
+# A run segment is raw μ-law bytes or base64 text still to be decoded
+Segment = Union[bytes, str]
+
+
+def _segment_size(segment: Segment) -> int:
+    """Decoded size in bytes, without decoding"""
+    if isinstance(segment, str):
+        return len(segment) // 4 * 3 - segment.endswith("=") - segment.endswith("==")
+    return len(segment)
+
+
+def _silence(size: int) -> bytes:
+    return _SILENCE_BLOCK[:size] if size <= len(_SILENCE_BLOCK) else bytes([ULAW_SILENCE]) * size
+
+
+def _decode_segments(segments: List[Segment]) -> bytes:
+    """Decode a run of segments in one pass; a corrupt payload becomes silence"""
+    try:
+        return b"".join([
+            binascii.a2b_base64(segment) if isinstance(segment, str) else segment
+            for segment in segments
+        ])
+    except (binascii.Error, ValueError):
+        decoded = []
+        for segment in segments:
+            try:
+                decoded.append(binascii.a2b_base64(segment) if isinstance(segment, str) else segment)
+            except (binascii.Error, ValueError):
+                decoded.append(_silence(_segment_size(segment)))
+        return b"".join(decoded)
+
+
+class _Track:
+    """One direction of a call, backed by a μ-law WAV file"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+        self.data_bytes = 0  # Written by the writer thread only
+        # Owned by the event loop: a contiguous run of audio starting at buffer_offset
+        self.segments: List[Segment] = []
+        self.buffered_bytes = 0
+        self.buffer_offset = 0
+
+    @property
+    def end_offset(self) -> int:
+        """Timeline position just after the last audio handed to this track"""
+        return self.buffer_offset + self.buffered_bytes
+
+    def take_run(self) -> List[Segment]:
+        """Hand the buffered run to the writer and start an empty one after it"""
+        segments = self.segments
+        self.buffer_offset += self.buffered_bytes
+        self.segments = []
+        self.buffered_bytes = 0
+        return segments
+
+
+class _RecordingWriter:
+    """Single background thread that performs all recorder disk I/O"""
+
+    def __init__(self, max_pending: int):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="call-recorder-writer", daemon=True)
+        self._thread.start()
+        self.bytes_written = 0
+
+    def submit(self, track: _Track, offset: int, segments: List[Segment]) -> bool:
+        """Queue a run for a timeline offset without blocking; False if saturated"""
+        try:
+            self._queue.put_nowait(("write", track, offset, segments, None))
+            return True
+        except queue.Full:
+            return False
+
+    def finalize(self, track: _Track, offset: int, segments: List[Segment]) -> threading.Event:
+        """Queue the last run for a track plus the header fix-up (may block)"""
+        done = threading.Event()
+        self._queue.put(("close", track, offset, segments, done))
+        return done
+
+    def _run(self):
+        while True:
+            op, track, offset, segments, done = self._queue.get()
+            try:
+                if track.file is None:
+                    track.path.parent.mkdir(parents=True, exist_ok=True)
+                    track.file = open(track.path, 'wb')
+                    track.file.write(ulaw_wav_header(0))
+                data = _decode_segments(segments) if segments else b""
+                if data:
+                    # Offsets only move forward; anything skipped is silence
+                    gap = remaining = max(0, offset - track.data_bytes)
+                    while remaining:
+                        block = min(remaining, len(_SILENCE_BLOCK))
+                        track.file.write(_SILENCE_BLOCK[:block])
+                        remaining -= block
+                    track.file.write(data)
+                    track.data_bytes += gap + len(data)
+                    self.bytes_written += gap + len(data)
+                if op == "close":
+                    # Header fix-up is the only work left at hang-up
+                    track.file.seek(0)
+                    track.file.write(ulaw_wav_header(track.data_bytes))
+                    track.file.close()
+            except Exception as e:
+                logger.error(f"Recording write failed for {track.path}: {e}")
+            finally:
+                if done is not None:
+                    done.set()
+
+
+_writer: Optional[_RecordingWriter] = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer(max_pending: int) -> _RecordingWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = _RecordingWriter(max_pending)
+        return _writer
+
+
+class CallRecorder:
+    """
+    Per-call recorder streaming both directions to disk
+
+    Audio is buffered per track until ``flush_bytes`` (1 s of 8 kHz μ-law by
+    default) and then handed to the background writer. If the writer falls
+    behind, a track keeps at most ``max_buffered_bytes`` in memory and drops
+    the oldest audio beyond that (the timeline is preserved, the dropped span
+    becomes silence).
+
+    Caller audio is placed by Twilio's media timestamp (ms since stream
+    start). Agent audio is placed at its arrival time, but never before the
+    end of the previous agent chunk, since Twilio plays it back sequentially.
+    """
+
+    def __init__(
+        self,
+        call_id: str,
+        spool_dir: Path,
+        flush_bytes: int = 8000,
+        max_buffered_bytes: int = 80000,
+        writer_queue_size: int = 1024
+    ):
+        self.call_id = call_id
+        self.flush_bytes = flush_bytes
+        self.max_buffered_bytes = max_buffered_bytes
+        self.user_track = _Track(Path(spool_dir) / f"{call_id}_user.wav")
+        self.agent_track = _Track(Path(spool_dir) / f"{call_id}_agent.wav")
+        self._writer = _get_writer(writer_queue_size)
+        self._closed = False
+        self._started_at = time.monotonic()
+        self._last_sequence = -1
+        self.dropped_bytes = 0
+        self.duplicate_frames = 0
+
+    def add_user_audio(self, chunk: Segment, timestamp_ms: Optional[int] = None, sequence_number: Optional[int] = None):
+        """
+        Place caller audio (μ-law from Twilio, raw or base64) on the timeline
+
+        ``timestamp_ms`` and ``sequence_number`` are Twilio's media.timestamp
+        and sequenceNumber. Replayed sequence numbers are ignored; without a
+        timestamp the chunk is appended after the previous one.
+        """
+        if sequence_number is not None:
+            if sequence_number <= self._last_sequence:
+                self.duplicate_frames += 1
+                return
+            self._last_sequence = sequence_number
+        offset = timestamp_ms * BYTES_PER_MS if timestamp_ms is not None else self.user_track.end_offset
+        self._place(self.user_track, offset, chunk)
+
+    def add_agent_audio(self, chunk: Segment):
+        """Place agent audio (μ-law from ElevenLabs, raw or base64) at its playback position"""
+        arrival = int((time.monotonic() - self._started_at) * 1000) * BYTES_PER_MS
+        self._place(self.agent_track, max(arrival, self.agent_track.end_offset), chunk)
+
+    def _place(self, track: _Track, offset: int, chunk: Segment):
+        size = _segment_size(chunk) if chunk else 0
+        if self._closed or not size:
+            return
+        end = track.end_offset
+        if offset > end and track.segments:
+            if offset - end >= self.flush_bytes:
+                self._flush(track)
+            if track.segments:
+                # Short gap (or saturated writer): fill with silence inside the current run
+                track.segments.append(_silence(offset - end))
+                track.buffered_bytes += offset - end
+        if not track.segments:
+            track.buffer_offset = max(offset, end)
+        track.segments.append(chunk)
+        track.buffered_bytes += size
+        if track.buffered_bytes >= self.flush_bytes:
+            self._flush(track)
+
+    def _flush(self, track: _Track):
+        if self._writer.submit(track, track.buffer_offset, track.segments):
+            track.take_run()
+        elif track.buffered_bytes > self.max_buffered_bytes:
+            # Drop the oldest whole segments; the dropped span becomes silence
+            overflow = 0
+            drop = 0
+            while track.buffered_bytes - overflow > self.max_buffered_bytes:
+                overflow += _segment_size(track.segments[drop])
+                drop += 1
+            del track.segments[:drop]
+            track.buffered_bytes -= overflow
+            track.buffer_offset += overflow
+            if not self.dropped_bytes:
+                logger.warning(f"Recorder writer saturated - dropping audio for {self.call_id}")
+            self.dropped_bytes += overflow
+
+    def close(self) -> Tuple[Path, Path]:
+        """
+        Flush remaining audio and fix up both WAV headers
+
+        Blocks until the writer has finished; use ``finish`` from async code.
+        Returns: (user_track_path, agent_track_path)
+        """
+        if not self._closed:
+            self._closed = True
+            pending = []
+            for track in (self.user_track, self.agent_track):
+                offset = track.buffer_offset
+                pending.append(self._writer.finalize(track, offset, track.take_run()))
+            for done in pending:
+                done.wait()
+        return self.user_track.path, self.agent_track.path
+
+    async def finish(self) -> Tuple[Path, Path]:
+        """Close the recorder without blocking the event loop"""
+        return await asyncio.to_thread(self.close)
+
+    def discard(self):
+        """Close and delete both track files (nothing to process for this call)"""
+        self.close()
+        for track in (self.user_track, self.agent_track):
+            track.path.unlink(missing_ok=True)
+
+
+def recording_bytes_written() -> int:
+    """Audio bytes the writer thread has written to recording tracks since start"""
+    return _writer.bytes_written if _writer is not None else 0
+
+
+def purge_spool(spool_dir: Path, max_age_seconds: float) -> int:
+    """
+    Delete track files not modified for ``max_age_seconds``
+
+    Tracks normally go away once the call's recording is mixed; leftovers
+    are from calls whose processing failed or never ran (kept for a while
+    so they can be recovered by hand). Returns the number of files deleted.
+    """
+    cutoff = time.time() - max_age_seconds
+    deleted = 0
+    for path in Path(spool_dir).glob("*.wav"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                deleted += 1
+        except FileNotFoundError:
+            pass
+    if deleted:
+        logger.info(f"Removed {deleted} stale track file(s) from {spool_dir}")
+    return deleted
+
+
+def spool_stats(spool_dir: Path) -> Dict:
+    """Track files currently in the spool and their total size"""
+    files = 0
+    size = 0
+    for path in Path(spool_dir).glob("*.wav"):
+        try:
+            size += path.stat().st_size
+            files += 1
+        except FileNotFoundError:
+            pass
+    return {"files": files, "bytes": size}
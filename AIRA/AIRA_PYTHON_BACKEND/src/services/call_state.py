@@ -0,0 +1,317 @@
+"""
+Call state shared between requests
+
+A call's requests can land on different worker processes: /call/outbound
+stores the phone number that /media needs, and the transfer stores the
+whisper summary that /whisper reads. The in-memory backend is enough for a
+single worker; the SQLite (WAL) backend shares state between all workers on
+a host. Every entry has a TTL, so state of calls that never finish cleanly
+does not accumulate; ``stats()`` exposes entry counts to confirm it stays flat.
+Code on the event loop uses the ``*_async`` methods: SQLite calls (which can
+wait on another worker's write lock) then run in a worker thread.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS call_state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_call_state_expires ON call_state (expires_at);
+"""
+
+# Expired entries are never returned; they are deleted every N writes
+PURGE_EVERY_WRITES = 500
+
+
+class CallStateStore(ABC):
+    """Namespaced key/value store with per-entry TTLs (values must be JSON-serializable)"""
+
+    backend = ""
+    # Calls may block (disk, cross-process locks): the async methods use a worker thread
+    blocking = True
+
+    def __init__(self):
+        self._writes = 0
+        self.expired_count = 0  # Entries removed by TTL (this process)
+        self.removed_count = 0  # Entries deleted or popped (this process)
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        ...
+
+    @abstractmethod
+    def pop(self, namespace: str, key: str) -> Any:
+        """Value (or None) and remove it, atomically"""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many"""
+
+    @abstractmethod
+    def count(self, namespace: str) -> int:
+        """Live (unexpired) entries in a namespace"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Stored entries per namespace, expired ones included until purged"""
+
+    def close(self):
+        pass
+
+    async def _run(self, method, *args):
+        if self.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get_async(self, namespace: str, key: str) -> Any:
+        return await self._run(self.get, namespace, key)
+
+    async def set_async(self, namespace: str, key: str, value: Any, ttl: float):
+        await self._run(self.set, namespace, key, value, ttl)
+
+    async def pop_async(self, namespace: str, key: str) -> Any:
+        return await self._run(self.pop, namespace, key)
+
+    async def delete_async(self, namespace: str, key: str) -> bool:
+        return await self._run(self.delete, namespace, key)
+
+    async def stats_async(self) -> Dict:
+        return await self._run(self.stats)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.backend,
+            "entries": self.counts(),
+            "expired": self.expired_count,
+            "removed": self.removed_count,
+        }
+
+    def map(self, namespace: str, ttl: float) -> "CallStateMap":
+        """Dict-like view of one namespace"""
+        return CallStateMap(self, namespace, ttl)
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self.purge_expired()
+
+
+class MemoryCallStateStore(CallStateStore):
+    """Process-local backend (single worker)"""
+
+    backend = "memory"
+    blocking = False
+
+    def __init__(self):
+        super().__init__()
+        self._data: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Any:
+        entry = self._data.get((namespace, key))
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[(namespace, key)] = (value, time.time() + ttl)
+        self._wrote()
+
+    def pop(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            entry = self._data.pop((namespace, key), None)
+        if entry is not None:
+            self.removed_count += 1
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            removed = self._data.pop((namespace, key), None) is not None
+        self.removed_count += removed
+        return removed
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._data.items() if expires_at <= now]
+            for k in expired:
+                del self._data[k]
+        self.expired_count += len(expired)
+        return len(expired)
+
+    def count(self, namespace: str) -> int:
+        now = time.time()
+        return sum(1 for (ns, _), (_, expires_at) in list(self._data.items()) if ns == namespace and expires_at > now)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for namespace, _ in list(self._data):
+            counts[namespace] = counts.get(namespace, 0) + 1
+        return counts
+
+
+class SQLiteCallStateStore(CallStateStore):
+    """Backend shared by every worker process on the host (SQLite in WAL mode)"""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: Path):
+        super().__init__()
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM call_state WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO call_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+            )
+        self._wrote()
+
+    def pop(self, namespace: str, key: str) -> Any:
+        with self._lock:
+            # DELETE ... RETURNING makes the read-and-remove atomic across processes
+            rows = self._conn.execute(
+                "DELETE FROM call_state WHERE namespace = ? AND key = ? RETURNING value, expires_at",
+                (namespace, key)
+            ).fetchall()
+        self.removed_count += len(rows)
+        if not rows or rows[0][1] <= time.time():
+            return None
+        return json.loads(rows[0][0])
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM call_state WHERE namespace = ? AND key = ?", (namespace, key)
+            ).rowcount
+        self.removed_count += removed
+        return removed > 0
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            expired = self._conn.execute(
+                "DELETE FROM call_state WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+        self.expired_count += expired
+        return expired
+
+    def count(self, namespace: str) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM call_state WHERE namespace = ? AND expires_at > ?",
+                (namespace, time.time())
+            ).fetchone()
+        return count
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*) FROM call_state GROUP BY namespace"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CallStateMap:
+    """
+    One namespace of a CallStateStore with dict-style access
+
+    Writes use the map's TTL. Stands in for the module-level dicts the app
+    used to keep, so call sites read the same; the ``*_async`` methods are
+    for call sites on the event loop.
+    """
+
+    def __init__(self, store: CallStateStore, namespace: str, ttl: float):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.store.get(self.namespace, key) if key else None
+        return default if value is None else value
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        value = self.store.pop(self.namespace, key) if key else None
+        return default if value is None else value
+
+    async def get_async(self, key: str, default: Any = None) -> Any:
+        value = await self.store.get_async(self.namespace, key) if key else None
+        return default if value is None else value
+
+    async def pop_async(self, key: str, default: Any = None) -> Any:
+        value = await self.store.pop_async(self.namespace, key) if key else None
+        return default if value is None else value
+
+    async def set_async(self, key: str, value: Any):
+        await self.store.set_async(self.namespace, key, value, self.ttl)
+
+    async def delete_async(self, key: str) -> bool:
+        return await self.store.delete_async(self.namespace, key) if key else False
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.store.set(self.namespace, key, value, self.ttl)
+
+    def __delitem__(self, key: str):
+        if not self.store.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return self.store.count(self.namespace)
+
+
+def create_call_state_store(backend: str, db_path: Optional[Path] = None) -> CallStateStore:
+    """Store for CALL_STATE_BACKEND: "memory" or "sqlite" """
+    if backend == "memory":
+        return MemoryCallStateStore()
+    if backend == "sqlite":
+        if db_path is None:
+            raise ValueError("The sqlite call state backend needs a database path")
+        return SQLiteCallStateStore(db_path)
+    raise ValueError(f"Unknown call state backend: {backend}")
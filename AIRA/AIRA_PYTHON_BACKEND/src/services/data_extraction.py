@@ -1,80 +1,58 @@
 """
 Service for extracting structured data from conversations using Azure OpenAI
 """
+import asyncio
 import json
 import logging
-from typing import List, Dict
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+
+import httpx
+
+from .extraction_cache import ExtractionCache, make_cache_key
+from ..utils.metrics import Counter, Histogram
 
 logger = logging.getLogger(__name__)
 
 try:
-    from openai import AzureOpenAI
+    from openai import AzureOpenAI, AsyncAzureOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
+DEFAULT_API_VERSION = "2024-02-15-preview"
+DEFAULT_MODEL_NAME = "gpt-4"
+# Bump when the prompt or response handling changes, to invalidate cached results
+PROMPT_VERSION = "1"
+# Rough token estimate for chunking (no tokenizer dependency); errs on the safe side for English
+CHARS_PER_TOKEN = 4
 
-def extract_structured_data(
-    conversation: List[Dict[str, str]], 
-    azure_api_key: str = None,
-    azure_endpoint: str = None,
-    azure_api_version: str = None,
-    azure_model_name: str = None
-) -> Dict:
-    """
-    Extract structured userData from conversation transcript using Azure OpenAI
-    """
-    # Default structure with null values
-    default_structure = {
-        "candidate_name": None,
-        "current_company": None,
-        "current_role": None,
-        "desired_role": None,
-        "domain": None,
-        "notice_period": None,
-        "current_location": None,
-        "relocation_willing": None,
-        "experience_years": None,
-        "current_ctc_lpa": None,
-        "expected_ctc_lpa": None,
-        "email": None,
-        "next_round_availability": None,
-        "communication_score": None,
-        "technical_score": None,
-        "overall_score": None,
-        "interested": None,
-        "call_status": None,
-        "disconnection_reason": None
-    }
-    
-    if not OPENAI_AVAILABLE:
-        logger.warning("OpenAI package not installed")
-        print("⚠️  OpenAI not installed - returning empty structure")
-        return default_structure
-    
-    if not azure_api_key or not azure_endpoint:
-        logger.warning("Azure OpenAI credentials not configured")
-        print("⚠️  Azure OpenAI not configured - returning empty structure")
-        return default_structure
-    
-    try:
-        # Build conversation text
-        transcript_text = "\n".join([
-            f"{'Candidate' if msg['role'] == 'user' else 'AIRA'}: {msg['text']}"
-            for msg in conversation
-        ])
-        
-        print(f"📤 Sending transcript to Azure OpenAI for extraction...")
-        
-        # Initialize Azure OpenAI client
-        client = AzureOpenAI(
-            api_key=azure_api_key,
-            api_version=azure_api_version or "2024-02-15-preview",
-            azure_endpoint=azure_endpoint
-        )
-        
-        # Extraction prompt
-        system_prompt = """You are a data extraction assistant. Extract structured information from HR interview transcripts.
+# Default structure with null values
+DEFAULT_STRUCTURE = {
+    "candidate_name": None,
+    "current_company": None,
+    "current_role": None,
+    "desired_role": None,
+    "domain": None,
+    "notice_period": None,
+    "current_location": None,
+    "relocation_willing": None,
+    "experience_years": None,
+    "current_ctc_lpa": None,
+    "expected_ctc_lpa": None,
+    "email": None,
+    "next_round_availability": None,
+    "communication_score": None,
+    "technical_score": None,
+    "overall_score": None,
+    "interested": None,
+    "call_status": None,
+    "disconnection_reason": None
+}
+
+# Extraction prompt
+SYSTEM_PROMPT = """You are a data extraction assistant. Extract structured information from HR interview transcripts.
 
 Extract the following fields into JSON format. Use null for fields not mentioned:
 {
@@ -116,30 +94,420 @@ Rules:
 
 Return ONLY valid JSON, no explanation."""
 
-        # Call Azure OpenAI
-        response = client.chat.completions.create(
-            model=azure_model_name or "gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Extract data from this interview:\n\n{transcript_text}"}
-            ],
-            temperature=0,
-            response_format={"type": "json_object"}
+# Appended to the system prompt when updating a running extraction with new turns
+UPDATE_INSTRUCTIONS = """
+
+You are updating data extracted earlier in the same interview. You receive the data extracted so far and ONLY the new part of the transcript.
+- Keep existing values unless the new part adds, corrects or contradicts them
+- Re-evaluate scores using both the previous scores and the new responses
+- Return the complete updated JSON with every field"""
+
+# Appended to the system prompt for one chunk of a long transcript
+CHUNK_INSTRUCTIONS = """
+
+This is part {index} of {total} of a longer interview. Extract only what this part states; use null for anything not covered here.
+- call_status / disconnection_reason: only if this part contains the end of the call"""
+
+# Scores are averaged across chunks; every other field takes the last non-null value
+SCORE_FIELDS = ("communication_score", "technical_score", "overall_score")
+
+# Shared clients, created lazily and reused across extractions (keyed by credentials)
+_sync_clients: Dict[Tuple, "AzureOpenAI"] = {}
+_async_clients: Dict[Tuple, "AsyncAzureOpenAI"] = {}
+_clients_lock = threading.Lock()
+
+# Optional memoization cache (see configure_extraction_cache)
+_cache: Optional[ExtractionCache] = None
+
+# Azure OpenAI round trips (cache hits excluded); every chunk and incremental update counts
+extraction_latency = Histogram()
+extraction_errors = Counter()
+
+
+def configure_extraction_cache(cache: Optional[ExtractionCache]):
+    """Install the extraction cache used by all extraction calls (None disables it)"""
+    global _cache
+    _cache = cache
+
+
+def extraction_cache_stats() -> Optional[Dict]:
+    return _cache.stats() if _cache else None
+
+
+def _client_key(azure_api_key: str, azure_endpoint: str, azure_api_version: Optional[str]) -> Tuple:
+    return (azure_endpoint, azure_api_key, azure_api_version or DEFAULT_API_VERSION)
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120)
+
+
+def get_client(azure_api_key: str, azure_endpoint: str, azure_api_version: str = None) -> "AzureOpenAI":
+    """Shared synchronous Azure OpenAI client with keep-alive connection pooling"""
+    key = _client_key(azure_api_key, azure_endpoint, azure_api_version)
+    with _clients_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = AzureOpenAI(
+                api_key=azure_api_key,
+                api_version=key[2],
+                azure_endpoint=azure_endpoint,
+                http_client=httpx.Client(limits=_pool_limits(), timeout=60)
+            )
+            _sync_clients[key] = client
+        return client
+
+
+def get_async_client(azure_api_key: str, azure_endpoint: str, azure_api_version: str = None) -> "AsyncAzureOpenAI":
+    """
+    Shared async Azure OpenAI client with keep-alive connection pooling
+
+    Must be used from the application event loop only.
+    """
+    key = _client_key(azure_api_key, azure_endpoint, azure_api_version)
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncAzureOpenAI(
+            api_key=azure_api_key,
+            api_version=key[2],
+            azure_endpoint=azure_endpoint,
+            http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=60)
         )
+        _async_clients[key] = client
+    return client
+
+
+async def close_extraction_clients():
+    """Close pooled connections of all shared clients (application shutdown)"""
+    for client in list(_async_clients.values()):
+        await client.close()
+    _async_clients.clear()
+    with _clients_lock:
+        for client in _sync_clients.values():
+            client.close()
+        _sync_clients.clear()
+
+
+def _format_turn(msg: Dict[str, str]) -> str:
+    return f"{'Candidate' if msg['role'] == 'user' else 'AIRA'}: {msg['text']}"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_conversation(conversation: List[Dict[str, str]], max_tokens: int) -> List[List[Dict[str, str]]]:
+    """
+    Split a transcript into consecutive chunks of at most ``max_tokens``
+
+    Turns are never split; a single turn over the budget becomes its own chunk.
+    """
+    chunks: List[List[Dict[str, str]]] = []
+    current: List[Dict[str, str]] = []
+    current_tokens = 0
+    for msg in conversation:
+        tokens = estimate_tokens(_format_turn(msg))
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(msg)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _to_score(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def merge_structured_data(results: List[Dict]) -> Dict:
+    """
+    Merge per-chunk extraction results, in transcript order
+
+    Facts and call outcome: the last non-null value wins (later corrections
+    override earlier statements). Scores: mean of the chunks that scored them;
+    overall_score is recomputed from the merged communication and technical
+    scores when both exist.
+    """
+    merged = dict(DEFAULT_STRUCTURE)
+    for result in results:
+        for key in DEFAULT_STRUCTURE:
+            if key not in SCORE_FIELDS and result.get(key) is not None:
+                merged[key] = result[key]
+
+    averages = {}
+    for key in SCORE_FIELDS:
+        scores = [s for s in (_to_score(r.get(key)) for r in results) if s is not None]
+        if scores:
+            averages[key] = sum(scores) / len(scores)
+    if "communication_score" in averages and "technical_score" in averages:
+        averages["overall_score"] = (averages["communication_score"] + averages["technical_score"]) / 2
+
+    # Same shape as a single extraction: number strings such as "7.5"
+    for key, value in averages.items():
+        merged[key] = f"{round(value, 1):g}"
+    return merged
+
+
+def _build_messages(
+    conversation: List[Dict[str, str]],
+    previous_data: Optional[Dict] = None,
+    chunk: Optional[Tuple[int, int]] = None
+) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for a full extraction, an update when previous_data
+    is given, or one (index, total) chunk of a long transcript
+    """
+    transcript_text = "\n".join([_format_turn(msg) for msg in conversation])
+    if chunk is not None:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT + CHUNK_INSTRUCTIONS.format(index=chunk[0], total=chunk[1])},
+            {"role": "user", "content": f"Extract data from this part of the interview:\n\n{transcript_text}"}
+        ]
+    if previous_data is None:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Extract data from this interview:\n\n{transcript_text}"}
+        ]
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT + UPDATE_INSTRUCTIONS},
+        {"role": "user", "content": (
+            f"Data extracted so far:\n{json.dumps(previous_data, ensure_ascii=False)}\n\n"
+            f"New part of the interview:\n\n{transcript_text}"
+        )}
+    ]
+
+
+def _parse_response(response) -> Dict:
+    """Parse the model output and ensure all expected fields exist"""
+    extracted_data = json.loads(response.choices[0].message.content)
+    for key in DEFAULT_STRUCTURE.keys():
+        if key not in extracted_data:
+            extracted_data[key] = None
+    return extracted_data
+
+
+def extraction_available(azure_api_key: str, azure_endpoint: str) -> bool:
+    """True if Azure OpenAI extraction can run with these credentials"""
+    return OPENAI_AVAILABLE and bool(azure_api_key and azure_endpoint)
+
+
+def _can_extract(azure_api_key: str, azure_endpoint: str) -> bool:
+    if not OPENAI_AVAILABLE:
+        logger.warning("OpenAI package not installed")
+        print("⚠️  OpenAI not installed - returning empty structure")
+        return False
+    if not azure_api_key or not azure_endpoint:
+        logger.warning("Azure OpenAI credentials not configured")
+        print("⚠️  Azure OpenAI not configured - returning empty structure")
+        return False
+    return True
+
+
+def extract_structured_data(
+    conversation: List[Dict[str, str]], 
+    azure_api_key: str = None,
+    azure_endpoint: str = None,
+    azure_api_version: str = None,
+    azure_model_name: str = None
+) -> Dict:
+    """
+    Extract structured userData from conversation transcript using Azure OpenAI
+    """
+    if not _can_extract(azure_api_key, azure_endpoint):
+        return dict(DEFAULT_STRUCTURE)
+    
+    try:
+        print(f"📤 Sending transcript to Azure OpenAI for extraction...")
         
-        # Parse response
-        extracted_data = json.loads(response.choices[0].message.content)
+        messages = _build_messages(conversation)
+        model = azure_model_name or DEFAULT_MODEL_NAME
+        cache_key = make_cache_key(messages, model, PROMPT_VERSION) if _cache else None
+        cached = _cache.get(cache_key) if _cache else None
+        if cached is not None:
+            print(f"✅ Extraction served from cache")
+            return cached
+
+        client = get_client(azure_api_key, azure_endpoint, azure_api_version)
+        started = time.monotonic()
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+            extracted_data = _parse_response(response)
+        except Exception:
+            extraction_errors.inc()
+            raise
+        finally:
+            extraction_latency.observe(time.monotonic() - started)
+        if _cache:
+            _cache.put(cache_key, extracted_data)
         print(f"✅ Data extracted successfully using Azure OpenAI")
         logger.info("Structured data extracted successfully using Azure OpenAI")
-        
-        # Ensure all expected fields exist
-        for key in default_structure.keys():
-            if key not in extracted_data:
-                extracted_data[key] = None
-        
         return extracted_data
         
     except Exception as e:
         logger.error(f"Failed to extract structured data: {e}")
         print(f"❌ Extraction failed: {e}")
-        return default_structure
+        return dict(DEFAULT_STRUCTURE)
+
+
+async def _request_extraction_async(
+    messages: List[Dict[str, str]],
+    azure_api_key: str,
+    azure_endpoint: str,
+    azure_api_version: str = None,
+    azure_model_name: str = None
+) -> Dict:
+    """
+    Send one extraction request on the shared async client (raises on failure)
+
+    Identical requests are answered from the memoization cache when configured.
+    """
+    model = azure_model_name or DEFAULT_MODEL_NAME
+    cache_key = make_cache_key(messages, model, PROMPT_VERSION) if _cache else None
+    if _cache:
+        cached = await _cache.get_async(cache_key)
+        if cached is not None:
+            logger.info("Extraction served from cache")
+            return cached
+
+    client = get_async_client(azure_api_key, azure_endpoint, azure_api_version)
+    started = time.monotonic()
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+        extracted_data = _parse_response(response)
+    except Exception:
+        extraction_errors.inc()
+        raise
+    finally:
+        extraction_latency.observe(time.monotonic() - started)
+    if _cache:
+        await _cache.put_async(cache_key, extracted_data)
+    return extracted_data
+
+
+async def _extract_chunked_async(
+    chunks: List[List[Dict[str, str]]],
+    max_concurrency: int,
+    azure_api_key: str,
+    azure_endpoint: str,
+    azure_api_version: str = None,
+    azure_model_name: str = None
+) -> Dict:
+    """Map: extract every chunk in parallel (bounded). Reduce: merge_structured_data"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    total = len(chunks)
+
+    async def extract_chunk(index: int, chunk: List[Dict[str, str]]) -> Dict:
+        async with semaphore:
+            return await _request_extraction_async(
+                _build_messages(chunk, chunk=(index, total)),
+                azure_api_key,
+                azure_endpoint,
+                azure_api_version,
+                azure_model_name
+            )
+
+    results = await asyncio.gather(
+        *(extract_chunk(index, chunk) for index, chunk in enumerate(chunks, start=1)),
+        return_exceptions=True
+    )
+    succeeded = [r for r in results if not isinstance(r, BaseException)]
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if not succeeded:
+        raise failures[0]
+    if failures:
+        logger.warning(f"{len(failures)}/{total} extraction chunks failed, merging the rest: {failures[0]}")
+    return merge_structured_data(succeeded)
+
+
+async def extract_structured_data_async(
+    conversation: List[Dict[str, str]],
+    azure_api_key: str = None,
+    azure_endpoint: str = None,
+    azure_api_version: str = None,
+    azure_model_name: str = None,
+    max_chunk_tokens: int = 0,
+    max_concurrency: int = 4
+) -> Dict:
+    """
+    Async variant of extract_structured_data using the shared async client
+
+    Runs on the event loop directly - no thread hand-off needed. With
+    ``max_chunk_tokens`` set, transcripts over that budget are split into
+    chunks that are extracted in parallel (at most ``max_concurrency`` at a
+    time) and merged, so latency follows the longest chunk rather than the
+    whole call and long calls stay within the model's context window.
+    """
+    if not _can_extract(azure_api_key, azure_endpoint):
+        return dict(DEFAULT_STRUCTURE)
+
+    try:
+        chunks = chunk_conversation(conversation, max_chunk_tokens) if max_chunk_tokens > 0 else []
+        if len(chunks) > 1:
+            print(f"📤 Sending transcript to Azure OpenAI in {len(chunks)} chunks...")
+            extracted_data = await _extract_chunked_async(
+                chunks,
+                max(1, max_concurrency),
+                azure_api_key,
+                azure_endpoint,
+                azure_api_version,
+                azure_model_name
+            )
+            print(f"✅ Data extracted successfully using Azure OpenAI ({len(chunks)} chunks merged)")
+            logger.info(f"Structured data extracted from {len(chunks)} chunks using Azure OpenAI")
+            return extracted_data
+
+        print(f"📤 Sending transcript to Azure OpenAI for extraction...")
+
+        extracted_data = await _request_extraction_async(
+            _build_messages(conversation),
+            azure_api_key,
+            azure_endpoint,
+            azure_api_version,
+            azure_model_name
+        )
+        print(f"✅ Data extracted successfully using Azure OpenAI")
+        logger.info("Structured data extracted successfully using Azure OpenAI")
+        return extracted_data
+
+    except Exception as e:
+        logger.error(f"Failed to extract structured data: {e}")
+        print(f"❌ Extraction failed: {e}")
+        return dict(DEFAULT_STRUCTURE)
+
+
+async def update_structured_data_async(
+    previous_data: Dict,
+    new_turns: List[Dict[str, str]],
+    azure_api_key: str,
+    azure_endpoint: str,
+    azure_api_version: str = None,
+    azure_model_name: str = None
+) -> Dict:
+    """
+    Update previously extracted data with only the new conversation turns
+
+    Unlike extract_structured_data_async this raises on failure, so callers
+    can keep their previous state instead of replacing it with nulls.
+    """
+    return await _request_extraction_async(
+        _build_messages(new_turns, previous_data),
+        azure_api_key,
+        azure_endpoint,
+        azure_api_version,
+        azure_model_name
+    )
@@ -0,0 +1,228 @@
+"""
+ElevenLabs Conversational AI sessions and a warm-connection pool
+
+Opening a conversation costs a TLS handshake, the WebSocket upgrade, the
+``conversation_initiation_client_data`` send and the wait for the agent's
+metadata. The warm pool does all of that while an outbound call is still
+ringing, keyed by call SID, and hands the ready session to the media relay
+when Twilio's stream starts. The agent starts talking as soon as the
+conversation is initialised, so its greeting is buffered during ringing and
+played on answer; audio beyond ``max_buffered_audio_ms`` is dropped, since
+it would be the agent talking into the silence of a long ring.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import websockets
+
+from ..utils.frame_codec import decode_elevenlabs_message, ULAW_BYTES_PER_MS
+
+logger = logging.getLogger(__name__)
+
+# Sent right after connecting: μ-law 8 kHz in both directions, as Twilio streams it
+CONVERSATION_INIT = {
+    "type": "conversation_initiation_client_data",
+    "conversation_config_override": {
+        "asr": {
+            "quality": "high",
+            "user_input_audio_format": "ulaw_8000"
+        },
+        "tts": {
+            "output_format": "ulaw_8000"
+        }
+    }
+}
+
+
+class ElevenLabsSession:
+    """An initialised conversation WebSocket plus anything received before hand-off"""
+
+    def __init__(self, call_sid: Optional[str], ws, prewarmed: bool, connect_seconds: float):
+        self.call_sid = call_sid
+        self.ws = ws
+        self.prewarmed = prewarmed
+        self.connect_seconds = connect_seconds
+        self.created_at = time.monotonic()
+        self.buffered: List = []  # Messages received while warm (metadata, greeting audio, ...)
+        self.buffered_audio_bytes = 0
+        self.expired = False
+        self._hold_task: Optional[asyncio.Task] = None
+
+    async def messages(self) -> AsyncIterator:
+        """Buffered messages first, then the live stream"""
+        buffered, self.buffered = self.buffered, []
+        for message in buffered:
+            yield message
+        async for message in self.ws:
+            yield message
+
+    async def close(self):
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+
+async def open_session(ws_url: str, api_key: str, call_sid: Optional[str] = None, prewarmed: bool = False) -> ElevenLabsSession:
+    """Connect and send the conversation initiation message"""
+    started = time.monotonic()
+    ws = await websockets.connect(ws_url, extra_headers={"xi-api-key": api_key})
+    await ws.send(json.dumps(CONVERSATION_INIT))
+    return ElevenLabsSession(call_sid, ws, prewarmed, time.monotonic() - started)
+
+
+class ElevenLabsWarmPool:
+    """
+    Pre-connected sessions keyed by call SID
+
+    A warm session answers pings and buffers everything else (up to
+    ``max_buffered_messages``) until it is claimed. Sessions not claimed
+    within ``ttl_seconds`` are closed, as are those for calls that end
+    without a media stream (busy, no-answer, failed).
+    """
+
+    def __init__(
+        self,
+        ws_url: str,
+        api_key: str,
+        ttl_seconds: float = 60.0,
+        max_sessions: int = 50,
+        max_buffered_messages: int = 1000,
+        max_buffered_audio_ms: int = 10000
+    ):
+        self.ws_url = ws_url
+        self.api_key = api_key
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_buffered_messages = max_buffered_messages
+        self.max_buffered_audio_bytes = max_buffered_audio_ms * ULAW_BYTES_PER_MS
+        self._pending: Dict[str, asyncio.Task] = {}  # call_sid -> connect task (result: session)
+
+        self.prewarmed = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.failed = 0
+        self.dropped_audio = 0
+
+    def prewarm(self, call_sid: str) -> bool:
+        """Start connecting a session for a call that is being placed"""
+        if call_sid in self._pending:
+            return True
+        if len(self._pending) >= self.max_sessions:
+            logger.warning(f"ElevenLabs warm pool full ({self.max_sessions}) - {call_sid} will connect cold")
+            return False
+        self._pending[call_sid] = asyncio.create_task(self._connect_and_hold(call_sid))
+        self.prewarmed += 1
+        return True
+
+    async def acquire(self, call_sid: Optional[str]) -> ElevenLabsSession:
+        """The warm session for this call if there is one, else a new connection"""
+        session = await self.claim(call_sid) if call_sid else None
+        if session is None:
+            session = await open_session(self.ws_url, self.api_key, call_sid)
+        return session
+
+    async def claim(self, call_sid: str) -> Optional[ElevenLabsSession]:
+        """
+        Take the warm session for a call
+
+        Waits if it is still connecting (that is still faster than starting
+        over). None if there is none or it expired or failed.
+        """
+        task = self._pending.pop(call_sid, None)
+        if task is None:
+            self.misses += 1
+            return None
+        try:
+            session = await task
+        except Exception as e:
+            logger.warning(f"Pre-warmed ElevenLabs session failed for {call_sid}: {e}")
+            self.failed += 1
+            return None
+
+        if session._hold_task is not None:
+            session._hold_task.cancel()
+            try:
+                await session._hold_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if session.expired or session.ws.closed:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return session
+
+    async def discard(self, call_sid: str):
+        """Drop the warm session of a call that will not stream"""
+        task = self._pending.pop(call_sid, None)
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+        try:
+            session = await task
+        except (asyncio.CancelledError, Exception):
+            return
+        if session._hold_task is not None:
+            session._hold_task.cancel()
+        await session.close()
+
+    async def close(self):
+        """Close every warm session (application shutdown)"""
+        for call_sid in list(self._pending):
+            await self.discard(call_sid)
+
+    async def _connect_and_hold(self, call_sid: str) -> ElevenLabsSession:
+        session = await open_session(self.ws_url, self.api_key, call_sid, prewarmed=True)
+        session._hold_task = asyncio.create_task(self._hold(session))
+        return session
+
+    async def _hold(self, session: ElevenLabsSession):
+        """Keep a warm session alive until claimed (cancelled) or expired"""
+        deadline = session.created_at + self.ttl_seconds
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                # Cancelling recv() is safe: no message is lost when the session is claimed
+                message = await asyncio.wait_for(session.ws.recv(), timeout=remaining)
+                msg_type, data, audio = decode_elevenlabs_message(message)
+                if msg_type == "ping":
+                    event_id = data.get("ping_event", {}).get("event_id")
+                    await session.ws.send(json.dumps({"type": "pong", "event_id": event_id}))
+                elif msg_type in ("audio", "agent_response") and session.buffered_audio_bytes >= self.max_buffered_audio_bytes:
+                    # Past the greeting: the agent is talking to nobody, don't replay it on answer
+                    self.dropped_audio += msg_type == "audio"
+                elif len(session.buffered) < self.max_buffered_messages:
+                    if audio:
+                        session.buffered_audio_bytes += len(audio) * 3 // 4
+                    session.buffered.append(message)
+        except asyncio.TimeoutError:
+            logger.info(f"Pre-warmed ElevenLabs session for {session.call_sid} expired unused")
+            self.expired += 1
+            session.expired = True
+            self._pending.pop(session.call_sid, None)
+            await session.close()
+        except websockets.ConnectionClosed as e:
+            logger.warning(f"Pre-warmed ElevenLabs session for {session.call_sid} closed: {e}")
+            self.failed += 1
+            session.expired = True
+            self._pending.pop(session.call_sid, None)
+
+    def stats(self) -> Dict:
+        claims = self.hits + self.misses
+        return {
+            "warm": len(self._pending),
+            "prewarmed": self.prewarmed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / claims, 3) if claims else None,
+            "expired": self.expired,
+            "failed": self.failed,
+            "dropped_audio": self.dropped_audio,
+        }
@@ -0,0 +1,166 @@
+"""
+Memoization cache for structured-data extraction
+
+Extraction is a pure function of the prompt, the model and the (normalised)
+transcript, so identical requests are answered from an in-memory LRU with a
+TTL, backed by an on-disk SQLite store that survives restarts. Callers on
+the event loop use ``get_async`` / ``put_async``, which touch the disk tier
+from a worker thread. Expired rows are deleted by ``purge_expired``.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def make_cache_key(messages: List[Dict[str, str]], model: str, prompt_version: str) -> str:
+    """
+    Content hash of an extraction request
+
+    Whitespace differences in the transcript do not change the key.
+    """
+    normalised = [(m["role"], " ".join(m["content"].split())) for m in messages]
+    material = json.dumps([prompt_version, model, normalised], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """In-memory LRU with TTL in front of a SQLite store; thread-safe"""
+
+    def __init__(self, db_path: Optional[Path] = None, max_entries: int = 512, ttl_seconds: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path is not None:
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached extraction result, or None"""
+        value = self._get_memory(key)
+        if value is None and self._conn is not None:
+            value = self._get_disk(key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    async def get_async(self, key: str) -> Optional[Dict]:
+        """get without blocking the event loop on a disk read"""
+        value = self._get_memory(key)
+        if value is None and self._conn is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def put(self, key: str, value: Dict):
+        """Store a successful extraction result"""
+        expires_at = self._put_memory(key, value)
+        if self._conn is not None:
+            self._put_disk(key, value, expires_at)
+
+    async def put_async(self, key: str, value: Dict):
+        """put without blocking the event loop on the disk write"""
+        expires_at = self._put_memory(key, value)
+        if self._conn is not None:
+            await asyncio.to_thread(self._put_disk, key, value, expires_at)
+
+    def _get_memory(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return dict(value)
+
+    def _get_disk(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM extraction_cache WHERE key = ? AND expires_at > ?",
+                    (key, time.time())
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Extraction cache read failed: {e}")
+                return None
+            if row is None:
+                return None
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            self.disk_hits += 1
+            return dict(value)
+
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _put_memory(self, key: str, value: Dict) -> float:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, dict(value))
+        return expires_at
+
+    def _put_disk(self, key: str, value: Dict, expires_at: float):
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extraction_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Extraction cache write failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the on-disk store"""
+        if self._conn is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM extraction_cache WHERE expires_at <= ?", (time.time(),))
+            return cursor.rowcount
+
+    def _remember(self, key: str, expires_at: float, value: Dict):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current in-memory size"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+        }
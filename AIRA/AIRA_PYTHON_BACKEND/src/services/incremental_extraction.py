@@ -0,0 +1,125 @@
+"""
+Incremental structured-data extraction for a live call
+
+Keeps a running UserData state that is updated in the background as new
+turns arrive, sending only the turns added since the last update. Transfers
+read the running state, and post-call extraction only has to fold in the
+last few turns. A backlog left by failed updates is sent in token-budgeted
+pieces (see chunk_conversation), one after another.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from .data_extraction import DEFAULT_STRUCTURE, chunk_conversation, extraction_available, update_structured_data_async
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalExtractor:
+    """
+    Running extraction state for one call
+
+    An update is started once ``min_new_turns`` turns are pending, or once
+    any turn is pending and ``min_interval`` seconds have passed since the
+    last update. At most one update is in flight at a time.
+    """
+
+    def __init__(
+        self,
+        conversation: List[Dict[str, str]],
+        azure_api_key: str = None,
+        azure_endpoint: str = None,
+        azure_api_version: str = None,
+        azure_model_name: str = None,
+        min_new_turns: int = 4,
+        min_interval: float = 20.0,
+        max_chunk_tokens: int = 0
+    ):
+        self.conversation = conversation  # Shared with the relay, appended to as the call goes on
+        self._credentials = (azure_api_key, azure_endpoint, azure_api_version, azure_model_name)
+        self.enabled = extraction_available(azure_api_key, azure_endpoint)
+        self.min_new_turns = min_new_turns
+        self.min_interval = min_interval
+        self.max_chunk_tokens = max_chunk_tokens
+
+        self.state: Dict = dict(DEFAULT_STRUCTURE)
+        self.processed_turns = 0
+        self.update_count = 0
+        self._last_update_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_turns(self) -> int:
+        return len(self.conversation) - self.processed_turns
+
+    def on_turn(self):
+        """Call after appending a turn; starts a debounced background update"""
+        if not self.enabled or self._in_flight():
+            return
+        pending = self.pending_turns
+        due = time.monotonic() - self._last_update_at >= self.min_interval
+        if pending >= self.min_new_turns or (pending and due):
+            self._start_update()
+
+    async def snapshot(self) -> Dict:
+        """
+        Current state for a transfer summary
+
+        Waits for an in-flight update, but only starts a new one if nothing
+        has been extracted yet.
+        """
+        if self._in_flight():
+            await asyncio.shield(self._task)
+        if self.enabled and self.processed_turns == 0 and self.pending_turns:
+            await asyncio.shield(self._start_update())
+        return dict(self.state)
+
+    async def finalize(self) -> Dict:
+        """
+        Fold in any remaining turns and return the final structured data
+
+        If the last update failed, the state misses the closing turns:
+        check ``complete`` before relying on the result.
+        """
+        if self._in_flight():
+            await asyncio.shield(self._task)
+        if self.enabled and self.pending_turns:
+            await asyncio.shield(self._start_update())
+        return dict(self.state)
+
+    @property
+    def has_state(self) -> bool:
+        """True once at least one update succeeded"""
+        return self.update_count > 0
+
+    @property
+    def complete(self) -> bool:
+        """True if the state covers every turn of the conversation"""
+        return self.has_state and not self.pending_turns
+
+    def _in_flight(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _start_update(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self._update())
+        return self._task
+
+    async def _update(self):
+        end = len(self.conversation)
+        new_turns = self.conversation[self.processed_turns:end]
+        if not new_turns:
+            return
+        self._last_update_at = time.monotonic()
+        pieces = chunk_conversation(new_turns, self.max_chunk_tokens) if self.max_chunk_tokens > 0 else [new_turns]
+        for piece in pieces:
+            try:
+                self.state = await update_structured_data_async(self.state, piece, *self._credentials)
+            except Exception as e:
+                # Keep the previous state; the rest stays pending for the next update
+                logger.error(f"Incremental extraction failed: {e}")
+                return
+            self.processed_turns += len(piece)
+            self.update_count += 1
+            logger.info(f"Incremental extraction updated with {len(piece)} new turns")
@@ -3,11 +3,38 @@ Service for integrating with Node.js backend
 """
 import logging
 import requests
+import httpx
 from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 
+def _status_payload(call_sid: str, status: str, phone_number: str, call_type: str) -> Dict:
+    """Build the /api/calls/status request body"""
+    return {
+        'callSid': call_sid,
+        'status': status,
+        'phoneNumber': phone_number,
+        'callType': call_type,
+    }
+
+
+def _call_data_payload(call_summary: Dict) -> Dict:
+    """Transform a call summary to match the Node.js schema"""
+    return {
+        'callSid': call_summary.get('call_sid'),
+        'phoneNumber': call_summary.get('phone_number'),
+        'startTime': call_summary.get('start_time'),
+        'endTime': call_summary.get('end_time'),
+        'duration': call_summary.get('duration_seconds'),
+        'transferRequested': call_summary.get('transfer_requested', False),
+        'transferNumber': call_summary.get('transfer_number'),
+        'structuredData': call_summary.get('structured_data', {}),
+        'conversation': call_summary.get('conversation', []),
+        'recordingPath': call_summary.get('recording_path'),  # Add recording path
+    }
+
+
 class NodeJSIntegration:
     """Handle communication with Node.js backend"""
     
@@ -24,12 +51,7 @@ class NodeJSIntegration:
         """
         try:
             url = f"{self.nodejs_url}/api/calls/status"
-            data = {
-                'callSid': call_sid,
-                'status': status,
-                'phoneNumber': phone_number,
-                'callType': call_type,
-            }
+            data = _status_payload(call_sid, status, phone_number, call_type)
             
             response = self.session.post(url, json=data, timeout=5)
             response.raise_for_status()
@@ -47,20 +69,7 @@ class NodeJSIntegration:
         """
         try:
             url = f"{self.nodejs_url}/api/calls/data"
-            
-            # Transform data to match Node.js schema
-            data = {
-                'callSid': call_summary.get('call_sid'),
-                'phoneNumber': call_summary.get('phone_number'),
-                'startTime': call_summary.get('start_time'),
-                'endTime': call_summary.get('end_time'),
-                'duration': call_summary.get('duration_seconds'),
-                'transferRequested': call_summary.get('transfer_requested', False),
-                'transferNumber': call_summary.get('transfer_number'),
-                'structuredData': call_summary.get('structured_data', {}),
-                'conversation': call_summary.get('conversation', []),
-                'recordingPath': call_summary.get('recording_path'),  # Add recording path
-            }
+            data = _call_data_payload(call_summary)
             
             response = self.session.post(url, json=data, timeout=10)
             response.raise_for_status()
@@ -73,3 +82,48 @@ class NodeJSIntegration:
             logger.error(f"Failed to save call data: {e}")
             print(f"❌ Failed to send data to Node.js: {e}")
             return False
+
+
+class AsyncNodeJSIntegration:
+    """
+    Asyncio-native Node.js backend transport
+
+    Uses a pooled keep-alive HTTP client so deliveries never block the event
+    loop that relays live call audio. Updates are not sent directly: they go
+    through NodeJSOutbox, whose sender delivers them with ``post``.
+    """
+
+    def __init__(self, nodejs_url: str, max_connections: int = 20, timeout: float = 5.0):
+        self.nodejs_url = nodejs_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Lazily create the shared HTTP client on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.nodejs_url,
+                headers={'Content-Type': 'application/json'},
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def post(self, path: str, content: str, idempotency_key: str) -> httpx.Response:
+        """
+        POST a JSON body to the Node.js backend (raises httpx.HTTPError)
+
+        The idempotency key lets Node.js drop redelivered updates.
+        """
+        return await self.client.post(path, content=content, headers={'Idempotency-Key': idempotency_key})
+
+    async def aclose(self):
+        """Close the HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,317 @@
+"""
+Durable outbox for Node.js backend updates
+
+Status changes and call summaries are written to a local SQLite file first
+and delivered by a background sender, so a Node.js outage or deploy only
+delays updates instead of losing them.
+"""
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .nodejs_integration import AsyncNodeJSIntegration, _status_payload, _call_data_payload
+
+logger = logging.getLogger(__name__)
+
+STATUS_PATH = "/api/calls/status"
+CALL_DATA_PATH = "/api/calls/data"
+
+# 4xx responses that are still worth retrying
+RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    call_sid TEXT NOT NULL,
+    path TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    delivered_at REAL,
+    dead INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (delivered_at, dead, call_sid, id);
+"""
+
+
+class NodeJSOutbox:
+    """
+    Persistent, batched sender for Node.js updates
+
+    Exposes the same ``update_call_status`` / ``save_call_data`` methods as
+    NodeJSIntegration, but they only enqueue and return True once the update
+    is durably queued. Delivery order is preserved per callSid. They block on
+    SQLite, so code on the event loop uses the ``*_async`` variants, which
+    run the insert in a worker thread.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        transport: AsyncNodeJSIntegration,
+        batch_size: int = 50,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        retention_seconds: float = 86400.0,
+        poll_interval: Optional[float] = None
+    ):
+        self.db_path = Path(db_path)
+        self.transport = transport
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retention_seconds = retention_seconds
+        # Rows enqueued by other worker processes cannot wake this sender; poll for them
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.delivered_count = 0
+        self.failed_attempts = 0
+
+    # ------------------------------------------------------------------
+    # Producer side (safe to call from any thread)
+    # ------------------------------------------------------------------
+
+    def enqueue(self, call_sid: str, path: str, payload: Dict, idempotency_key: str) -> bool:
+        """
+        Durably queue a payload for delivery
+
+        Duplicate idempotency keys are ignored, so retried producers cannot
+        create duplicate deliveries.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox "
+                    "(idempotency_key, call_sid, path, payload, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (idempotency_key, call_sid or "", path, json.dumps(payload, ensure_ascii=False), now, now)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to enqueue Node.js update {idempotency_key}: {e}")
+            return False
+
+        self._notify()
+        return True
+
+    async def enqueue_async(self, call_sid: str, path: str, payload: Dict, idempotency_key: str) -> bool:
+        """enqueue off the event loop (another worker may hold the SQLite write lock)"""
+        return await asyncio.to_thread(self.enqueue, call_sid, path, payload, idempotency_key)
+
+    def update_call_status(self, call_sid: str, status: str, phone_number: str, call_type: str = 'outbound') -> bool:
+        """Queue a call status update (keyed per callSid and status)"""
+        return self.enqueue(
+            call_sid,
+            STATUS_PATH,
+            _status_payload(call_sid, status, phone_number, call_type),
+            f"{call_sid}:status:{status}"
+        )
+
+    async def update_call_status_async(
+        self,
+        call_sid: str,
+        status: str,
+        phone_number: str,
+        call_type: str = 'outbound'
+    ) -> bool:
+        """update_call_status for callers on the event loop"""
+        return await asyncio.to_thread(self.update_call_status, call_sid, status, phone_number, call_type)
+
+    def save_call_data(self, call_summary: Dict) -> bool:
+        """Queue the complete call summary (keyed per callSid)"""
+        call_sid = call_summary.get('call_sid')
+        queued = self.enqueue(
+            call_sid,
+            CALL_DATA_PATH,
+            _call_data_payload(call_summary),
+            f"{call_sid}:data"
+        )
+        if queued:
+            print(f"📬 Call data queued for Node.js backend")
+        return queued
+
+    def stats(self) -> Dict:
+        """Counts of pending, dead-lettered and delivered entries"""
+        with self._lock:
+            pending, dead = self._conn.execute(
+                "SELECT "
+                "COALESCE(SUM(delivered_at IS NULL AND dead = 0), 0), "
+                "COALESCE(SUM(dead = 1), 0) "
+                "FROM outbox"
+            ).fetchone()
+        return {
+            "pending": pending,
+            "dead": dead,
+            "delivered": self.delivered_count,
+            "failed_attempts": self.failed_attempts,
+        }
+
+    # ------------------------------------------------------------------
+    # Background sender
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background sender; queued rows from a previous run are replayed"""
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop the sender, then give it one last drain"""
+        if not self._task:
+            return
+        # Let the sender finish its current batch and exit first: a concurrent drain would
+        # fetch the same rows, and cancelling mid-batch would lose the record of sent ones
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Outbox sender error: {e}")
+        self._task = None
+        try:
+            await asyncio.wait_for(self.drain_once(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox drain timed out on shutdown; remaining updates stay queued")
+
+    def _notify(self):
+        """Wake the sender from whichever thread enqueued"""
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Loop already closed - the row is on disk and will be replayed
+            pass
+
+    async def _run(self):
+        pending = (await asyncio.to_thread(self.stats))["pending"]
+        if pending:
+            logger.info(f"Replaying {pending} queued Node.js updates")
+            print(f"📬 Replaying {pending} queued Node.js updates")
+
+        while not self._stopping:
+            try:
+                sent = await self.drain_once()
+                if sent:
+                    continue
+                delay = await asyncio.to_thread(self._seconds_until_next_due)
+                if self.poll_interval:
+                    delay = min(delay, self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox sender error: {e}")
+                delay = self.base_delay
+
+            if self._stopping:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due rows; returns the number of rows attempted"""
+        rows = await asyncio.to_thread(self._fetch_due, self.batch_size)
+        if not rows:
+            return 0
+
+        results = await asyncio.gather(*(self._deliver(row) for row in rows))
+        await asyncio.to_thread(self._record_results, results)
+        return len(rows)
+
+    async def _deliver(self, row: Tuple) -> Tuple[int, int, Optional[str], bool]:
+        """POST one row; returns (id, attempts, error, permanent_failure)"""
+        row_id, key, path, payload, attempts = row
+        try:
+            response = await self.transport.post(path, payload, key)
+            if response.status_code < 400:
+                return row_id, attempts, None, False
+            permanent = response.status_code < 500 and response.status_code not in RETRYABLE_CLIENT_ERRORS
+            return row_id, attempts, f"HTTP {response.status_code}", permanent
+        except httpx.HTTPError as e:
+            return row_id, attempts, str(e) or e.__class__.__name__, False
+
+    # ------------------------------------------------------------------
+    # SQLite helpers (run in worker threads)
+    # ------------------------------------------------------------------
+
+    def _fetch_due(self, limit: int) -> List[Tuple]:
+        """Oldest undelivered row per callSid, if its retry time has come"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT o.id, o.idempotency_key, o.path, o.payload, o.attempts FROM outbox o "
+                "JOIN (SELECT MIN(id) AS id FROM outbox "
+                "      WHERE delivered_at IS NULL AND dead = 0 GROUP BY call_sid) h ON h.id = o.id "
+                "WHERE o.next_attempt_at <= ? ORDER BY o.id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+
+    def _record_results(self, results: List[Tuple[int, int, Optional[str], bool]]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for row_id, attempts, error, permanent in results:
+                if error is None:
+                    self._conn.execute("UPDATE outbox SET delivered_at = ? WHERE id = ?", (now, row_id))
+                    self.delivered_count += 1
+                elif permanent:
+                    self._conn.execute(
+                        "UPDATE outbox SET dead = 1, attempts = ?, last_error = ? WHERE id = ?",
+                        (attempts + 1, error, row_id)
+                    )
+                    self.failed_attempts += 1
+                    logger.error(f"Node.js rejected outbox entry {row_id} permanently: {error}")
+                else:
+                    delay = min(self.max_delay, self.base_delay * (2 ** attempts))
+                    delay *= random.uniform(0.5, 1.0)
+                    self._conn.execute(
+                        "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                        (attempts + 1, now + delay, error, row_id)
+                    )
+                    self.failed_attempts += 1
+                    logger.warning(f"Node.js delivery failed ({error}); retry #{attempts + 1} in {delay:.1f}s")
+            # Delivered rows are kept for a while so late duplicates stay deduplicated
+            self._conn.execute(
+                "DELETE FROM outbox WHERE delivered_at IS NOT NULL AND delivered_at < ?",
+                (now - self.retention_seconds,)
+            )
+            self._conn.execute("COMMIT")
+
+    def _seconds_until_next_due(self) -> float:
+        with self._lock:
+            (next_at,) = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE delivered_at IS NULL AND dead = 0"
+            ).fetchone()
+        if next_at is None:
+            return self.max_delay
+        return max(0.0, min(self.max_delay, next_at - time.time()))
@@ -2,10 +2,16 @@
 Service for Twilio operations
 """
 import logging
+from typing import Dict, Iterable, Optional
+
+import httpx
 from twilio.rest import Client
 
 logger = logging.getLogger(__name__)
 
+# Transport errors raised before the request reached Twilio; after any other, it may have been acted on
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
 
 class TwilioService:
     """Handle Twilio operations"""
@@ -66,3 +72,159 @@ class TwilioService:
             error_msg = f"Transfer failed for {call_sid}: {str(e)}"
             logger.error(error_msg)
             raise Exception(error_msg)
+
+    def hangup(self, call_sid: str):
+        """End an in-progress call"""
+        self.client.calls(call_sid).update(status='completed')
+        logger.info(f"Call hung up: {call_sid}")
+
+
+class TwilioError(Exception):
+    """
+    Twilio REST API error (HTTP status plus Twilio's error code when given)
+
+    ``ambiguous`` is set when the request was sent but no response came back
+    (e.g. a read timeout): Twilio may have carried it out.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, code: Optional[int] = None, ambiguous: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.ambiguous = ambiguous
+
+
+class AsyncTwilioService:
+    """
+    Asyncio-native Twilio Calls API client
+
+    Talks to the REST API directly over a pooled keep-alive HTTP client, so
+    placing, redirecting and ending calls never blocks the event loop that
+    relays live call audio. ``api_base_url`` can point at the local stub
+    (``python -m src.services.twilio_stub``) for load tests.
+    """
+
+    API_VERSION = "2010-04-01"
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        phone_number: str,
+        api_base_url: str = "https://api.twilio.com",
+        max_connections: int = 20,
+        timeout: float = 10.0
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.phone_number = phone_number
+        self.api_base_url = api_base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Lazily create the shared HTTP client on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.api_base_url}/{self.API_VERSION}/Accounts/{self.account_sid}",
+                auth=(self.account_sid or "", self.auth_token or ""),
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def _post(self, path: str, data: Dict) -> Dict:
+        try:
+            response = await self.client.post(path, data=data)
+        except httpx.HTTPError as e:
+            raise TwilioError(f"Twilio request failed: {e}", ambiguous=not isinstance(e, _NOT_SENT_ERRORS)) from e
+        if response.status_code >= 400:
+            try:
+                error = response.json()
+            except ValueError:
+                error = {}
+            raise TwilioError(
+                error.get("message") or f"HTTP {response.status_code}",
+                status=response.status_code,
+                code=error.get("code")
+            )
+        return response.json()
+
+    async def create_call(
+        self,
+        to_number: str,
+        url: str,
+        status_callback: Optional[str] = None,
+        status_callback_events: Iterable[str] = ()
+    ) -> Dict:
+        """Place a call; returns Twilio's call resource"""
+        data = {"To": to_number, "From": self.phone_number, "Url": url}
+        if status_callback:
+            data["StatusCallback"] = status_callback
+            data["StatusCallbackEvent"] = list(status_callback_events)
+        return await self._post("/Calls.json", data)
+
+    async def update_call(self, call_sid: str, fields: Dict[str, str]) -> Dict:
+        """Modify a live call (``fields`` use Twilio's parameter names, e.g. Url, Status)"""
+        return await self._post(f"/Calls/{call_sid}.json", fields)
+
+    async def hangup(self, call_sid: str) -> Dict:
+        """End an in-progress call"""
+        call = await self.update_call(call_sid, {"Status": "completed"})
+        logger.info(f"Call hung up: {call_sid}")
+        return call
+
+    async def make_outbound_call(self, to_number: str, server_url: str) -> str:
+        """
+        Initiate outbound call
+
+        Returns: call_sid
+        """
+        try:
+            call = await self.create_call(
+                to_number,
+                f"{server_url}/voice",
+                status_callback=f"{server_url}/status",
+                status_callback_events=['initiated', 'ringing', 'answered', 'completed']
+            )
+
+            logger.info(f"Call initiated: {call['sid']}")
+            print(f"\n✅ Call initiated")
+            print(f"📞 Calling: {to_number}")
+            print(f"🆔 SID: {call['sid']}\n")
+
+            return call["sid"]
+
+        except TwilioError as e:
+            logger.error(f"Failed to initiate call: {e}")
+            print(f"\n❌ Error: {e}\n")
+            raise
+
+    async def transfer_call(self, call_sid: str, transfer_url: str) -> Dict:
+        """
+        Transfer call to another endpoint
+
+        Returns:
+            Updated call resource
+
+        Raises:
+            TwilioError: If transfer fails with details
+        """
+        try:
+            call = await self.update_call(call_sid, {"Url": transfer_url, "Method": "POST"})
+            logger.info(f"Call transfer initiated: {call_sid} -> {call.get('status')}")
+            return call
+        except TwilioError as e:
+            logger.error(f"Transfer failed for {call_sid}: {e}")
+            raise TwilioError(f"Transfer failed for {call_sid}: {e}", e.status, e.code, e.ambiguous) from e
+
+    async def aclose(self):
+        """Close the HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
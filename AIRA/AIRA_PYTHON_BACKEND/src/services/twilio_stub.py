@@ -0,0 +1,154 @@
+"""
+Local stand-in for the Twilio Calls REST API
+
+Accepts the requests AsyncTwilioService makes (create, update, hang up) and
+plays out each call's lifecycle through its status callbacks (initiated,
+ringing, in-progress, completed), so outbound calling can be load-tested
+without Twilio. No media stream is opened.
+
+Run: python -m src.services.twilio_stub --port 8081
+Then set TWILIO_API_BASE_URL=http://127.0.0.1:8081
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "busy", "no-answer", "failed", "canceled")
+
+
+def create_app(latency_ms: float = 0, ring_seconds: float = 2.0, call_seconds: float = 30.0) -> FastAPI:
+    """
+    Stub app
+
+    Every request is delayed by ``latency_ms``. A call rings for
+    ``ring_seconds``, is answered, and completes after ``call_seconds``
+    unless it is hung up first.
+    """
+    app = FastAPI(title="Twilio stub")
+    calls: Dict[str, Dict] = {}
+    lifecycles: Dict[str, asyncio.Task] = {}
+    counters = {"created": 0, "updated": 0, "callbacks": 0, "callback_errors": 0}
+    http: Dict[str, httpx.AsyncClient] = {}
+
+    async def callback(call: Dict, status: str):
+        call["status"] = status
+        url = call.get("status_callback")
+        if not url:
+            return
+        data = {
+            "AccountSid": call["account_sid"],
+            "CallSid": call["sid"],
+            "CallStatus": status,
+            "To": call["to"],
+            "From": call["from"],
+        }
+        if status in TERMINAL_STATUSES:
+            data["CallDuration"] = str(int(time.time() - call["created_at"]))
+        try:
+            await http["client"].post(url, data=data)
+            counters["callbacks"] += 1
+        except httpx.HTTPError as e:
+            counters["callback_errors"] += 1
+            logger.warning(f"Stub status callback failed for {call['sid']}: {e}")
+
+    async def lifecycle(call: Dict):
+        await callback(call, "initiated")
+        await callback(call, "ringing")
+        await asyncio.sleep(ring_seconds)
+        await callback(call, "in-progress")
+        await asyncio.sleep(call_seconds)
+        lifecycles.pop(call["sid"], None)
+        await callback(call, "completed")
+
+    async def delay():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    def resource(call: Dict) -> Dict:
+        return {key: value for key, value in call.items() if key not in ("created_at", "status_callback")}
+
+    @app.on_event("startup")
+    async def startup():
+        http["client"] = httpx.AsyncClient(timeout=10)
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        for task in lifecycles.values():
+            task.cancel()
+        await http["client"].aclose()
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Calls.json")
+    async def create_call(account_sid: str, request: Request):
+        await delay()
+        form = await request.form()
+        if not form.get("To") or not form.get("Url"):
+            return JSONResponse({"code": 21201, "message": "To and Url are required", "status": 400}, status_code=400)
+        call = {
+            "sid": "CA" + uuid.uuid4().hex,
+            "account_sid": account_sid,
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "status": "queued",
+            "created_at": time.time(),
+            "status_callback": form.get("StatusCallback"),
+        }
+        calls[call["sid"]] = call
+        counters["created"] += 1
+        lifecycles[call["sid"]] = asyncio.create_task(lifecycle(call))
+        return JSONResponse(resource(call), status_code=201)
+
+    @app.post("/2010-04-01/Accounts/{account_sid}/Calls/{call_sid}.json")
+    async def update_call(account_sid: str, call_sid: str, request: Request):
+        await delay()
+        call: Optional[Dict] = calls.get(call_sid)
+        if call is None:
+            return JSONResponse({"code": 20404, "message": f"Call {call_sid} not found", "status": 404}, status_code=404)
+        form = await request.form()
+        counters["updated"] += 1
+        if form.get("Status") in ("completed", "canceled") and call["status"] not in TERMINAL_STATUSES:
+            task = lifecycles.pop(call_sid, None)
+            if task is not None:
+                task.cancel()
+            await callback(call, form.get("Status"))
+        return resource(call)
+
+    @app.get("/stub/stats")
+    async def stats():
+        active = sum(1 for call in calls.values() if call["status"] not in TERMINAL_STATUSES)
+        return {"calls": len(calls), "active": active, **counters}
+
+    @app.get("/stub/calls/{call_sid}")
+    async def get_call(call_sid: str):
+        if call_sid not in calls:
+            raise HTTPException(status_code=404)
+        return resource(calls[call_sid])
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local Twilio Calls API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every API request")
+    parser.add_argument("--ring-seconds", type=float, default=2.0)
+    parser.add_argument("--call-seconds", type=float, default=30.0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.ring_seconds, args.call_seconds)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,15 @@
 from .transfer_detection import should_transfer
 from .file_storage import save_transcript, save_user_data
 from .async_processor import process_call_data_async
-from .completion_detection import should_end_call
+from .post_call_jobs import PostCallJobQueue
+from .completion_detection import should_end_call, set_completion_phrases
+from .phrase_matcher import PhraseMatcher, get_matcher
+from .frame_codec import decode_twilio_message, decode_elevenlabs_message, user_audio_message, pong_message, TwilioEnvelope, AudioCoalescer
+from .relay_stats import RelayStats, RelayRegistry
+from .send_queue import SendQueue, SendQueueClosed
+from .playback_tracker import PlaybackTracker
+from .worker_lease import WorkerLease
+from .turn_tracer import TurnTracer, turn_latency
+from .metrics import Counter, Histogram, MetricsWriter, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
-__all__ = ['should_transfer', 'save_transcript', 'save_user_data', 'process_call_data_async', 'should_end_call']
+__all__ = ['should_transfer', 'save_transcript', 'save_user_data', 'process_call_data_async', 'PostCallJobQueue', 'should_end_call', 'set_completion_phrases', 'PhraseMatcher', 'get_matcher', 'decode_twilio_message', 'decode_elevenlabs_message', 'user_audio_message', 'pong_message', 'TwilioEnvelope', 'AudioCoalescer', 'RelayStats', 'RelayRegistry', 'SendQueue', 'SendQueueClosed', 'PlaybackTracker', 'WorkerLease', 'TurnTracer', 'turn_latency', 'Counter', 'Histogram', 'MetricsWriter', 'METRICS_CONTENT_TYPE']
@@ -3,7 +3,9 @@ Async processor for handling call data processing without blocking
 """
 import asyncio
 import logging
-from typing import List, Dict
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import List, Dict, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -11,8 +13,8 @@ logger = logging.getLogger(__name__)
 
 async def process_call_data_async(
     conversation: List[Dict[str, str]],
-    user_audio_chunks: List[bytes],
-    agent_audio_chunks: List[bytes],
+    user_track: Optional[Path],
+    agent_track: Optional[Path],
     call_sid: str,
     to_number: str,
     call_start_time: datetime,
@@ -23,42 +25,83 @@ async def process_call_data_async(
     save_recording,
     save_transcript,
     save_user_data,
-    nodejs_integration
+    nodejs_integration,
+    extractor=None,
+    cpu_executor: Optional[Executor] = None,
+    io_executor: Optional[Executor] = None
 ):
     """
     Process call data asynchronously without blocking the main thread
+
+    The recording mix runs on ``cpu_executor`` (a process pool in production)
+    and blocking I/O on ``io_executor``; ``None`` uses the default thread pool.
+    ``extract_structured_data`` may be a coroutine function, which is awaited
+    on the loop instead of occupying an I/O thread. With an ``extractor``
+    (IncrementalExtractor) only the turns since its last update are sent;
+    a full extraction is the fallback if its state misses any turn.
+
+    Raises if any step failed, so the job queue reports the job as failed.
+    A failed recording mix does not stop the transcript and data from being
+    saved; it is raised once they are.
     """
+    loop = asyncio.get_running_loop()
+    recording_error = None
     try:
         call_duration = (call_end_time - call_start_time).total_seconds()
         
         # Save audio recording
         recording_path = None
-        if user_audio_chunks or agent_audio_chunks:
+        if user_track or agent_track:
             try:
-                recording_path = save_recording(
-                    user_audio_chunks,
-                    agent_audio_chunks,
+                recording_path = await loop.run_in_executor(
+                    cpu_executor,
+                    save_recording,
+                    user_track,
+                    agent_track,
                     to_number,
                     call_start_time,
-                    settings.RECORDINGS_DIR
+                    settings.RECORDINGS_DIR,
+                    settings.RECORDING_FORMAT
                 )
                 print(f"\n💾 Recording saved: {recording_path}")
                 logger.info(f"Recording saved: {recording_path}")
+
+                # Mixed recording is saved - the streamed tracks are no longer needed
+                for track in (user_track, agent_track):
+                    if track:
+                        Path(track).unlink(missing_ok=True)
             except Exception as e:
                 logger.error(f"Recording save failed: {e}")
                 print(f"❌ Recording save failed: {e}")
+                recording_error = e
         
         # Extract structured data
         structured_data = {}
         if conversation:
             print("\n🔄 Extracting structured data using Azure OpenAI...")
-            structured_data = extract_structured_data(
-                conversation,
-                settings.AZURE_OPENAI_API_KEY,
-                settings.AZURE_OPENAI_ENDPOINT,
-                settings.AZURE_OPENAI_API_VERSION,
-                settings.AZURE_OPENAI_MODEL_NAME
-            )
+            if extractor is not None and extractor.enabled:
+                structured_data = await extractor.finalize()
+
+            if extractor is not None and extractor.complete:
+                print(f"✅ Finalised incremental extraction ({extractor.update_count} updates)")
+            else:
+                if extractor is not None and extractor.has_state:
+                    # The closing turns (call outcome, availability) would be missing
+                    logger.warning(
+                        f"Incremental extraction left {extractor.pending_turns} turns unprocessed "
+                        f"for {call_sid}, running a full extraction"
+                    )
+                extraction_args = (
+                    conversation,
+                    settings.AZURE_OPENAI_API_KEY,
+                    settings.AZURE_OPENAI_ENDPOINT,
+                    settings.AZURE_OPENAI_API_VERSION,
+                    settings.AZURE_OPENAI_MODEL_NAME
+                )
+                if asyncio.iscoroutinefunction(extract_structured_data):
+                    structured_data = await extract_structured_data(*extraction_args)
+                else:
+                    structured_data = await loop.run_in_executor(io_executor, extract_structured_data, *extraction_args)
             
             # Print summary
             print("\n" + "="*60)
@@ -94,14 +137,18 @@ async def process_call_data_async(
                 "recording_path": recording_path
             }
             
-            transcript_path = save_transcript(
+            transcript_path = await loop.run_in_executor(
+                io_executor,
+                save_transcript,
                 summary_data,
                 to_number,
                 call_start_time,
                 settings.RECORDINGS_DIR
             )
             
-            userData_path = save_user_data(
+            userData_path = await loop.run_in_executor(
+                io_executor,
+                save_user_data,
                 structured_data,
                 to_number,
                 call_start_time,
@@ -112,14 +159,19 @@ async def process_call_data_async(
             print(f"💾 UserData: {userData_path}\n")
             
             # Send data to Node.js backend
-            nodejs_integration.save_call_data(summary_data)
-            
-            logger.info(f"Call data processed successfully: {call_sid}")
+            if not await loop.run_in_executor(io_executor, nodejs_integration.save_call_data, summary_data):
+                raise RuntimeError("Call data could not be queued for the Node.js backend")
             
         except Exception as e:
             logger.error(f"Failed to save files: {e}")
             print(f"❌ Failed to save files: {e}")
+            raise
             
     except Exception as e:
         logger.error(f"Error processing call data: {e}")
         print(f"❌ Error processing call data: {e}")
+        raise
+
+    if recording_error is not None:
+        raise RuntimeError(f"Recording save failed: {recording_error}") from recording_error
+    logger.info(f"Call data processed successfully: {call_sid}")
@@ -1,7 +1,9 @@
 """
 Utility for detecting call completion phrases
 """
-import re
+from typing import Iterable
+
+from .phrase_matcher import PhraseMatcher
 
 # Phrases that indicate the interview/screening is complete
 # Made more specific to avoid premature call ending
@@ -26,6 +28,21 @@ COMPLETION_PHRASES = [
     "end of screening",
 ]
 
+# Parts of a closing statement: "thank you" + "goodbye" + a closing wish
+THANK_YOU_PHRASES = ["thank you", "thanks"]
+GOODBYE_PHRASES = ["goodbye", "good bye"]
+CLOSING_PHRASES = ["have a great", "have a nice", "take care", "all the best", "best of luck"]
+
+_completion_matcher = PhraseMatcher(COMPLETION_PHRASES)
+_thank_you_matcher = PhraseMatcher(THANK_YOU_PHRASES)
+_goodbye_matcher = PhraseMatcher(GOODBYE_PHRASES)
+_closing_matcher = PhraseMatcher(CLOSING_PHRASES)
+
+
+def set_completion_phrases(phrases: Iterable[str]):
+    """Replace the completion phrase list (e.g. per campaign) and recompile it"""
+    _completion_matcher.reload(phrases)
+
 
 def should_end_call(agent_text: str) -> bool:
     """
@@ -41,18 +58,14 @@ def should_end_call(agent_text: str) -> bool:
     if not agent_text:
         return False
     
-    # Convert to lowercase for case-insensitive matching
-    text_lower = agent_text.lower().strip()
-    
-    # Check for completion phrases (more specific now)
-    for phrase in COMPLETION_PHRASES:
-        if phrase in text_lower:
-            return True
+    # Check for completion phrases (one compiled, case-insensitive pass)
+    if _completion_matcher.matches(agent_text):
+        return True
     
     # Check for patterns: "thank you" + "goodbye" + ("have a" OR "take care" OR "all the best")
-    has_thank_you = "thank you" in text_lower or "thanks" in text_lower
-    has_goodbye = "goodbye" in text_lower or "good bye" in text_lower
-    has_closing = any(word in text_lower for word in ["have a great", "have a nice", "take care", "all the best", "best of luck"])
+    has_thank_you = _thank_you_matcher.matches(agent_text)
+    has_goodbye = _goodbye_matcher.matches(agent_text)
+    has_closing = _closing_matcher.matches(agent_text)
     
     # Only end if we have all three elements (more complete closing)
     if has_thank_you and has_goodbye and has_closing:
@@ -0,0 +1,229 @@
+"""
+Frame codec for the Twilio <-> ElevenLabs media relay
+
+Audio frames dominate relay traffic (one per 20 ms per direction), and their
+only interesting field is a base64 payload. Those frames are parsed by
+slicing the payload out of the raw text and serialized by splicing it into
+pre-built envelopes, so the payload is never decoded or re-encoded as JSON.
+Field lookup tolerates whitespace around the colon; anything else (or any
+frame the fast path is unsure about) is fully parsed with orjson.
+"""
+import binascii
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+
+_TWILIO_EVENT_KEY = '"event"'
+_TWILIO_PAYLOAD_KEY = '"payload"'
+_TWILIO_TIMESTAMP_KEY = '"timestamp"'
+_TWILIO_SEQUENCE_KEY = '"sequenceNumber"'
+_ELEVENLABS_TYPE_KEY = '"type"'
+_ELEVENLABS_AUDIO_KEY = '"audio_base_64"'
+_JSON_WHITESPACE = " \t\r\n"
+ULAW_BYTES_PER_MS = 8
+
+
+def loads(message) -> Dict[str, Any]:
+    return orjson.loads(message)
+
+
+def dumps(obj) -> str:
+    """Serialize to a text frame (str, never bytes)"""
+    return orjson.dumps(obj).decode("utf-8")
+
+
+class MediaFrame(NamedTuple):
+    payload: str  # base64 μ-law, exactly as received
+    timestamp_ms: Optional[int]
+    sequence_number: Optional[int]
+
+
+def _string_value(message: str, key: str) -> Optional[str]:
+    """
+    Value of the first ``key`` (quoted field name) by slicing
+
+    None if absent, not followed by a string value, or escaped - callers
+    then fall back to a full parse.
+    """
+    start = message.find(key)
+    if start < 0:
+        return None
+    start += len(key)
+    if message.startswith('":"', start - 1):
+        start += 2  # Compact JSON (Twilio, ElevenLabs): skip the whitespace scan
+    else:
+        length = len(message)
+        while start < length and message[start] in _JSON_WHITESPACE:
+            start += 1
+        if not message.startswith(":", start):
+            return None
+        start += 1
+        while start < length and message[start] in _JSON_WHITESPACE:
+            start += 1
+        if not message.startswith('"', start):
+            return None
+        start += 1
+    end = message.find('"', start)
+    if end < 0:
+        return None
+    value = message[start:end]
+    if "\\" in value:
+        return None
+    return value
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _fast_twilio_media(message: str) -> Optional[MediaFrame]:
+    if _string_value(message, _TWILIO_EVENT_KEY) != "media":
+        return None
+    payload = _string_value(message, _TWILIO_PAYLOAD_KEY)
+    if not payload:
+        return None
+    return MediaFrame(
+        payload,
+        _int_or_none(_string_value(message, _TWILIO_TIMESTAMP_KEY)),
+        _int_or_none(_string_value(message, _TWILIO_SEQUENCE_KEY))
+    )
+
+
+def decode_twilio_message(message: str) -> Tuple[Optional[str], Optional[Dict], Optional[MediaFrame]]:
+    """
+    Parse a Twilio Media Streams message into (event, data, media)
+
+    ``data`` is None for media frames taken by the fast path; ``media`` is
+    set for every media frame.
+    """
+    media = _fast_twilio_media(message)
+    if media is not None:
+        return "media", None, media
+
+    data = loads(message)
+    event = data.get("event")
+    if event == "media":
+        fields = data.get("media", {})
+        if fields.get("payload"):
+            media = MediaFrame(
+                fields["payload"],
+                _int_or_none(fields.get("timestamp")),
+                _int_or_none(data.get("sequenceNumber"))
+            )
+    return event, data, media
+
+
+def decode_elevenlabs_message(message) -> Tuple[Optional[str], Optional[Dict], Optional[str]]:
+    """
+    Parse an ElevenLabs Conversational AI message into (type, data, audio)
+
+    ``audio`` is the base64 payload of an audio event; ``data`` is None when
+    the fast path handled it.
+    """
+    if isinstance(message, str) and _string_value(message, _ELEVENLABS_TYPE_KEY) == "audio":
+        audio = _string_value(message, _ELEVENLABS_AUDIO_KEY)
+        if audio:
+            return "audio", None, audio
+
+    data = loads(message)
+    msg_type = data.get("type")
+    audio = None
+    if msg_type == "audio":
+        audio = data.get("audio_event", {}).get("audio_base_64")
+    return msg_type, data, audio
+
+
+def user_audio_message(payload: str) -> str:
+    """ElevenLabs user_audio_chunk frame (base64 needs no JSON escaping)"""
+    return '{"user_audio_chunk":"' + payload + '"}'
+
+
+def pong_message(event_id) -> str:
+    return '{"type":"pong","event_id":' + dumps(event_id) + '}'
+
+
+class TwilioEnvelope:
+    """Outbound Twilio frames with the call's streamSid baked in"""
+
+    def __init__(self, stream_sid: str):
+        self.stream_sid = stream_sid
+        self._media_prefix = '{"event":"media","streamSid":' + dumps(stream_sid) + ',"media":{"payload":"'
+
+    def media(self, payload: str) -> str:
+        return self._media_prefix + payload + '"}}'
+
+    def mark(self, name: str) -> str:
+        """Mark Twilio echoes back once everything queued before it has played"""
+        return '{"event":"mark","streamSid":' + dumps(self.stream_sid) + ',"mark":{"name":' + dumps(name) + '}}'
+
+
+def concat_base64(parts: List[str]) -> str:
+    """
+    One base64 payload for consecutive base64 chunks (decoded and re-encoded once)
+
+    Raises binascii.Error if a chunk is not valid base64.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    audio = b"".join([binascii.a2b_base64(part) for part in parts])
+    return binascii.b2a_base64(audio, newline=False).decode("ascii")
+
+
+class AudioCoalescer:
+    """
+    Merges consecutive base64 μ-law frames into larger chunks
+
+    ``add`` returns a merged payload once ``target_ms`` of audio is buffered,
+    or once the oldest buffered frame has waited ``max_delay_ms``. Base64
+    frames cannot simply be concatenated (each one is padded), so frames are
+    decoded as they arrive and a merged chunk is encoded once, when emitted.
+    A frame that is not valid base64 is passed through unmerged (and counted
+    in ``invalid_frames``), as it would be without coalescing.
+    """
+
+    def __init__(self, target_ms: int, max_delay_ms: int):
+        self.target_bytes = target_ms * ULAW_BYTES_PER_MS
+        self.max_delay = max_delay_ms / 1000
+        self._audio = bytearray()
+        self._frames = 0
+        self._first_at = 0.0
+        self.invalid_frames = 0
+
+    def add(self, payload: str, now: float = None) -> List[str]:
+        """Buffer one frame; returns the payloads to send now, in order (often none)"""
+        now = time.monotonic() if now is None else now
+        try:
+            audio = binascii.a2b_base64(payload)
+        except binascii.Error:
+            self.invalid_frames += 1
+            pending = self.flush()
+            return [pending, payload] if pending else [payload]
+        if not self._frames:
+            self._first_at = now
+        self._audio += audio
+        self._frames += 1
+        if len(self._audio) >= self.target_bytes or now - self._first_at >= self.max_delay:
+            return [self.flush()]
+        return []
+
+    def flush(self) -> Optional[str]:
+        """Emit whatever is buffered (None if empty)"""
+        if not self._frames:
+            return None
+        payload = binascii.b2a_base64(self._audio, newline=False).decode("ascii")
+        self._audio = bytearray()
+        self._frames = 0
+        return payload
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Monotonic time by which the buffered audio must be sent"""
+        return self._first_at + self.max_delay if self._frames else None
+
+    @property
+    def pending_frames(self) -> int:
+        return self._frames
@@ -0,0 +1,104 @@
+"""
+Prometheus metrics
+
+GET /metrics is rendered at scrape time from counters the services already
+keep (relay stats, send queues, job queue, outbox, recorder), so the
+per-frame path does no extra work for it. Latencies with no existing
+counter go into fixed-bucket histograms here: one bisect and a few
+additions per observation, no locks, no dependency on prometheus_client.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers WebSocket connects (tens of ms) through LLM extractions (tens of s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    """Monotonic count for events no service already counts"""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Histogram:
+    """Observations counted into fixed upper-bound buckets"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Count of observations <= each bound, +Inf last"""
+        total = 0
+        counts = []
+        for count in self.bucket_counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Optional[Dict]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    """Builds one scrape in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        # HELP/TYPE once per family, even when samples with different labels follow
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, help_text: str, value: float, labels: Optional[Dict] = None):
+        self._declare(name, "counter", help_text)
+        self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def gauge(self, name: str, help_text: str, value: Optional[float], labels: Optional[Dict] = None):
+        if value is None:
+            return
+        self._declare(name, "gauge", help_text)
+        self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, histogram: Histogram, labels: Optional[Dict] = None):
+        self._declare(name, "histogram", help_text)
+        labels = labels or {}
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.cumulative()):
+            self._lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}")
+        self._lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+        self._lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
@@ -0,0 +1,96 @@
+"""
+Compiled multi-phrase matcher
+
+Builds one regular expression from a phrase list by merging the phrases into
+a character trie (shared prefixes are matched once), so a lookup is a single
+pass over the text whose cost does not grow with the number of phrases.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+_END = ""  # Trie marker: a phrase ends at this node
+
+
+def _build_trie(phrases: Iterable[str]) -> Dict:
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[_END] = True
+    return trie
+
+
+def _trie_to_regex(node: Dict) -> str:
+    """Regex for a trie node; greedy, so the longest phrase at a position wins"""
+    optional = _END in node
+    alternatives = [re.escape(char) + _trie_to_regex(child) for char, child in sorted(node.items()) if char != _END]
+    if not alternatives:
+        return ""
+    pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    return f"(?:{pattern})?" if optional else pattern
+
+
+def _normalise(phrases: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(sorted({p.lower().strip() for p in phrases if p and p.strip()}))
+
+
+class PhraseMatcher:
+    """
+    Case-insensitive matcher for a set of phrases
+
+    By default a phrase matches anywhere in the text (substring semantics).
+    With ``whole_words`` a match must not start or end inside a word.
+    """
+
+    def __init__(self, phrases: Iterable[str], whole_words: bool = False):
+        self.whole_words = whole_words
+        self.phrases: Tuple[str, ...] = ()
+        self._pattern: Optional[Pattern] = None
+        self.reload(phrases)
+
+    def reload(self, phrases: Iterable[str]):
+        """Rebuild from a new phrase list; the swap is atomic for concurrent readers"""
+        normalised = _normalise(phrases)
+        pattern = None
+        if normalised:
+            body = _trie_to_regex(_build_trie(normalised))
+            if self.whole_words:
+                body = rf"(?<!\w)(?:{body})(?!\w)"
+            pattern = re.compile(body)
+        self.phrases, self._pattern = normalised, pattern
+
+    def search(self, text: str) -> Optional[str]:
+        """First (longest at that position) matching phrase, or None"""
+        if not text or self._pattern is None:
+            return None
+        match = self._pattern.search(text.lower())
+        return match.group(0) if match else None
+
+    def matches(self, text: str) -> bool:
+        return self.search(text) is not None
+
+    def findall(self, text: str) -> List[str]:
+        """All non-overlapping matching phrases, in order of appearance"""
+        if not text or self._pattern is None:
+            return []
+        return self._pattern.findall(text.lower())
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(phrases: Tuple[str, ...], whole_words: bool) -> PhraseMatcher:
+    return PhraseMatcher(phrases, whole_words)
+
+
+def get_matcher(phrases: Iterable[str], whole_words: bool = False) -> PhraseMatcher:
+    """
+    Shared matcher for a phrase list, compiled once per distinct list
+
+    A changed list (e.g. after a reload) produces a new matcher. Hot paths
+    should keep a PhraseMatcher instead, which skips hashing the list.
+    """
+    return _cached_matcher(tuple(phrases), whole_words)
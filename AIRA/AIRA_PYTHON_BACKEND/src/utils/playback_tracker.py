@@ -0,0 +1,72 @@
+"""
+Agent audio playback tracking with Twilio mark events
+
+Twilio echoes a ``mark`` back once all audio sent before it has been played
+to the caller. Marks sent after agent audio therefore tell exactly when the
+agent has finished speaking, e.g. to hang up right after a goodbye instead
+of after a fixed delay.
+"""
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class PlaybackTracker:
+    """Marks sent to Twilio that have not been acknowledged (played) yet"""
+
+    def __init__(self):
+        self._pending: "OrderedDict[str, float]" = OrderedDict()  # name -> sent at
+        self._ids = itertools.count(1)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.last_audio_at = 0.0
+        self.marks_sent = 0
+        self.marks_played = 0
+        self.last_mark_latency_ms: Optional[float] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def audio_sent(self):
+        """Call whenever agent audio is queued to Twilio"""
+        self.last_audio_at = time.monotonic()
+
+    def next_mark(self) -> str:
+        """Name for a new mark that is about to be sent"""
+        name = f"agent-{next(self._ids)}"
+        self._pending[name] = time.monotonic()
+        self.marks_sent += 1
+        self._idle.clear()
+        return name
+
+    def acknowledge(self, name: Optional[str]):
+        """Twilio reported the mark played (or cleared)"""
+        sent_at = self._pending.pop(name, None)
+        if sent_at is not None:
+            self.marks_played += 1
+            self.last_mark_latency_ms = (time.monotonic() - sent_at) * 1000
+        if not self._pending:
+            self._idle.set()
+
+    async def wait_until_played(self, settle_seconds: float, timeout: float) -> bool:
+        """
+        Wait until every mark has been played and no agent audio was queued
+        for ``settle_seconds`` (ElevenLabs may still be streaming the rest of
+        the utterance). False if ``timeout`` passed first.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return False
+            quiet = time.monotonic() - self.last_audio_at
+            if quiet >= settle_seconds:
+                return True
+            await asyncio.sleep(min(settle_seconds - quiet, max(deadline - time.monotonic(), 0)))
@@ -0,0 +1,170 @@
+"""
+Post-call job queue
+
+Runs post-call processing (recording mix, extraction, file saves, Node.js
+sync) outside the event loop that relays live audio: CPU-heavy audio work
+goes to a low-priority process pool, blocking I/O to a thread pool, and a
+bounded queue applies backpressure when hang-ups arrive in bursts.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _lower_priority():
+    """Process pool initializer: let live relays win the CPU"""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+
+
+class PostCallJobQueue:
+    """
+    Bounded queue of post-call jobs with a fixed number of workers
+
+    ``processor`` is awaited as ``processor(**job_kwargs, cpu_executor=...,
+    io_executor=...)`` for each job.
+    """
+
+    def __init__(
+        self,
+        processor: Callable,
+        max_queue_size: int = 100,
+        concurrency: int = 2,
+        cpu_workers: int = 1,
+        io_workers: int = 4,
+        history_size: int = 200
+    ):
+        self.processor = processor
+        self.max_queue_size = max_queue_size
+        self.concurrency = concurrency
+        self.cpu_workers = cpu_workers
+        self.io_workers = io_workers
+        self.history_size = history_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._cpu_pool: Optional[ProcessPoolExecutor] = None
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self.completed_count = 0
+        self.failed_count = 0
+
+    def start(self):
+        """Create the executors and worker tasks (call from the running loop)"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        # spawn, not fork: the parent has live sockets and writer threads
+        self._cpu_pool = ProcessPoolExecutor(
+            max_workers=self.cpu_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_lower_priority
+        )
+        self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="post-call-io")
+        self._workers = [
+            asyncio.create_task(self._worker(index))
+            for index in range(self.concurrency)
+        ]
+        logger.info(f"Post-call jobs: {self.concurrency} workers, queue size {self.max_queue_size}")
+
+    async def stop(self, timeout: float = 30.0):
+        """Let queued jobs finish (up to ``timeout``), then stop workers and pools"""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Post-call jobs still pending at shutdown: {self._queue.qsize()}")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, **job_kwargs) -> str:
+        """
+        Queue a post-call job and return its id
+
+        Waits while the queue is full (backpressure on the caller, which is
+        the hanging-up call's own handler, not the other live relays).
+        """
+        job_id = f"job-{next(self._ids)}"
+        call_sid = job_kwargs.get("call_sid")
+        job = {
+            "id": job_id,
+            "call_sid": call_sid,
+            "state": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+        }
+        self._remember(job)
+
+        if self._queue.full():
+            logger.warning(f"Post-call queue full ({self.max_queue_size}) - {call_sid} is waiting")
+        await self._queue.put((job, job_kwargs))
+        return job_id
+
+    def _remember(self, job: Dict):
+        """Track a job, evicting the oldest finished ones beyond history_size"""
+        self._jobs[job["id"]] = job
+        while len(self._jobs) > self.history_size:
+            oldest_id = next(iter(self._jobs))
+            if self._jobs[oldest_id]["state"] in ("queued", "running"):
+                break
+            self._jobs.popitem(last=False)
+
+    async def _worker(self, index: int):
+        while True:
+            job, job_kwargs = await self._queue.get()
+            job["state"] = "running"
+            job["started_at"] = time.time()
+            try:
+                await self.processor(
+                    **job_kwargs,
+                    cpu_executor=self._cpu_pool,
+                    io_executor=self._io_pool
+                )
+                job["state"] = "completed"
+                self.completed_count += 1
+            except asyncio.CancelledError:
+                job["state"] = "cancelled"
+                raise
+            except Exception as e:
+                job["state"] = "failed"
+                job["error"] = str(e)
+                self.failed_count += 1
+                logger.error(f"Post-call job {job['id']} failed for {job['call_sid']}: {e}")
+            finally:
+                job["finished_at"] = time.time()
+                self._queue.task_done()
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        return self._jobs.get(job_id)
+
+    def status(self) -> Dict:
+        """Queue depth, worker state and recent jobs"""
+        jobs = list(self._jobs.values())
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": sum(1 for j in jobs if j["state"] == "running"),
+            "max_queue_size": self.max_queue_size,
+            "concurrency": self.concurrency,
+            "completed": self.completed_count,
+            "failed": self.failed_count,
+            "jobs": jobs[::-1],
+        }
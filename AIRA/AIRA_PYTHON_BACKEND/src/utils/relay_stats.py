@@ -0,0 +1,187 @@
+"""
+Per-call media relay statistics
+
+Counts frames and WebSocket messages in both directions so the effect of
+relay settings (e.g. audio coalescing) on message rate can be measured
+per call rather than guessed. The registry also keeps process-wide totals
+(folded in as calls finish) for the /metrics endpoint.
+"""
+import statistics
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .metrics import Histogram
+
+# RelayStats counter -> relay direction, for cumulative frame totals
+FRAME_COUNTERS = {
+    "twilio_frames_in": "twilio_in",
+    "elevenlabs_messages_out": "elevenlabs_out",
+    "elevenlabs_messages_in": "elevenlabs_in",
+    "twilio_messages_out": "twilio_out",
+}
+
+
+class RelayStats:
+    """Message counters for one call's Twilio <-> ElevenLabs relay"""
+
+    def __init__(self, call_id: str, coalesce_ms: int = 0):
+        self.call_id = call_id
+        self.coalesce_ms = coalesce_ms
+        self.started_at = time.time()
+        self._started_monotonic = time.monotonic()
+        self._ended_monotonic: Optional[float] = None
+
+        self.twilio_frames_in = 0        # Caller audio frames from Twilio
+        self.elevenlabs_messages_out = 0  # user_audio_chunk messages sent
+        self.elevenlabs_messages_in = 0  # All ElevenLabs messages
+        self.elevenlabs_audio_in = 0     # ...of which agent audio events
+        self.twilio_messages_out = 0     # Media messages sent to Twilio
+        self.queues: Dict = {}           # name -> SendQueue, for per-direction depth
+
+        # Time to first agent audio, from Twilio's stream start to the first frame sent back
+        self.prewarmed: Optional[bool] = None
+        self.elevenlabs_connect_ms: Optional[float] = None
+        self._stream_started: Optional[float] = None
+        self.first_agent_audio_ms: Optional[float] = None
+
+        # AI-initiated hang-up: goodbye detected -> call ended, and whether Twilio confirmed playback
+        self.hangup_wait_ms: Optional[float] = None
+        self.hangup_after_playback: Optional[bool] = None
+
+        # Candidate transcript -> agent reply latencies (TurnTracer)
+        self.turns = None
+        # Caller audio coalescing (AudioCoalescer), when enabled
+        self.coalescer = None
+
+    @property
+    def duration(self) -> float:
+        end = self._ended_monotonic if self._ended_monotonic is not None else time.monotonic()
+        return max(end - self._started_monotonic, 1e-6)
+
+    def stream_started(self):
+        self._stream_started = time.monotonic()
+
+    def agent_audio_sent(self):
+        if self.first_agent_audio_ms is None and self._stream_started is not None:
+            self.first_agent_audio_ms = (time.monotonic() - self._stream_started) * 1000
+
+    def finish(self):
+        self._ended_monotonic = time.monotonic()
+
+    def as_dict(self) -> Dict:
+        duration = self.duration
+        return {
+            "call_id": self.call_id,
+            "coalesce_ms": self.coalesce_ms,
+            "duration_seconds": round(duration, 1),
+            "twilio_frames_in": self.twilio_frames_in,
+            "elevenlabs_messages_out": self.elevenlabs_messages_out,
+            "elevenlabs_messages_per_second": round(self.elevenlabs_messages_out / duration, 1),
+            "frames_per_message": round(self.twilio_frames_in / self.elevenlabs_messages_out, 2) if self.elevenlabs_messages_out else None,
+            "invalid_audio_frames": self.coalescer.invalid_frames if self.coalescer else None,
+            "elevenlabs_messages_in": self.elevenlabs_messages_in,
+            "elevenlabs_audio_in": self.elevenlabs_audio_in,
+            "twilio_messages_out": self.twilio_messages_out,
+            "twilio_messages_per_second": round(self.twilio_messages_out / duration, 1),
+            "queues": {name: queue.stats() for name, queue in self.queues.items()},
+            "prewarmed": self.prewarmed,
+            "elevenlabs_connect_ms": _round(self.elevenlabs_connect_ms),
+            "first_agent_audio_ms": _round(self.first_agent_audio_ms),
+            "hangup_wait_ms": _round(self.hangup_wait_ms),
+            "hangup_after_playback": self.hangup_after_playback,
+            "turn_latency": self.turns.summary() if self.turns else None,
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def _summarize(samples: List[float]) -> Dict:
+    if not samples:
+        return {"calls": 0}
+    return {
+        "calls": len(samples),
+        "avg_ms": round(statistics.fmean(samples), 1),
+        "p50_ms": round(statistics.median(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+class RelayRegistry:
+    """Stats for live relays plus the most recently finished ones"""
+
+    def __init__(self, history_size: int = 50):
+        self._active: Dict[int, RelayStats] = {}
+        self._recent: Deque[RelayStats] = deque(maxlen=history_size)
+        # Totals of finished relays; live ones are added at read time
+        self._finished_frames: Dict[str, int] = dict.fromkeys(FRAME_COUNTERS, 0)
+        self._finished_queue_drops: Dict[str, int] = {}
+        self.finished_count = 0
+        # ElevenLabs session acquire time, by whether the session was pre-warmed
+        self.connect_latency = {True: Histogram(), False: Histogram()}
+
+    def open(self, call_id: str, coalesce_ms: int = 0) -> RelayStats:
+        stats = RelayStats(call_id, coalesce_ms)
+        self._active[id(stats)] = stats
+        return stats
+
+    def close(self, stats: RelayStats):
+        stats.finish()
+        if self._active.pop(id(stats), None) is not None:
+            self._recent.append(stats)
+            self.finished_count += 1
+            for counter in FRAME_COUNTERS:
+                self._finished_frames[counter] += getattr(stats, counter)
+            for name, queue in stats.queues.items():
+                self._finished_queue_drops[name] = self._finished_queue_drops.get(name, 0) + queue.dropped
+
+    def record_connect(self, stats: RelayStats, prewarmed: bool, seconds: float):
+        """ElevenLabs session acquired for a relay"""
+        stats.prewarmed = prewarmed
+        stats.elevenlabs_connect_ms = seconds * 1000
+        self.connect_latency[bool(prewarmed)].observe(seconds)
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def frame_totals(self) -> Dict[str, int]:
+        """Frames/messages relayed since start, per direction (finished + live calls)"""
+        totals = dict(self._finished_frames)
+        for stats in list(self._active.values()):
+            for counter in FRAME_COUNTERS:
+                totals[counter] += getattr(stats, counter)
+        return {direction: totals[counter] for counter, direction in FRAME_COUNTERS.items()}
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Items waiting in the live relays' send queues, per queue"""
+        depths: Dict[str, int] = {}
+        for stats in list(self._active.values()):
+            for name, queue in stats.queues.items():
+                depths[name] = depths.get(name, 0) + queue.depth
+        return depths
+
+    def queue_drops(self) -> Dict[str, int]:
+        """Audio frames dropped by full send queues since start, per queue"""
+        drops = dict(self._finished_queue_drops)
+        for stats in list(self._active.values()):
+            for name, queue in stats.queues.items():
+                drops[name] = drops.get(name, 0) + queue.dropped
+        return drops
+
+    def time_to_first_audio(self) -> Dict[str, Dict]:
+        """Time-to-first-agent-audio over recent calls, with and without pre-warm"""
+        finished = [s for s in self._recent if s.first_agent_audio_ms is not None]
+        return {
+            "prewarmed": _summarize([s.first_agent_audio_ms for s in finished if s.prewarmed]),
+            "cold": _summarize([s.first_agent_audio_ms for s in finished if not s.prewarmed]),
+        }
+
+    def snapshot(self) -> Dict:
+        return {
+            "time_to_first_audio": self.time_to_first_audio(),
+            "active": [s.as_dict() for s in self._active.values()],
+            "recent": [s.as_dict() for s in reversed(self._recent)],
+        }
@@ -0,0 +1,198 @@
+"""
+Bounded outbound queue for one direction of the media relay
+
+Each direction is split into a reader (parses incoming frames and enqueues),
+a bounded queue and a writer task (the only place that awaits the peer's
+send). A slow peer then shows up as queue depth and policy counters rather
+than as a stalled reader and hidden latency.
+"""
+import asyncio
+import binascii
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .frame_codec import concat_base64
+
+logger = logging.getLogger(__name__)
+
+QUEUE_POLICIES = ("block", "drop_oldest", "merge")
+
+
+class SendQueueClosed(ConnectionError):
+    """The writer stopped (peer gone); nothing more can be sent"""
+
+
+class SendQueue:
+    """
+    Audio and control frames waiting to be sent to one peer
+
+    Only audio counts toward ``maxsize``; control frames (pongs, marks,
+    clears) are always queued. When the audio backlog is full:
+
+    - ``block``: the reader waits for space (backpressure upstream)
+    - ``drop_oldest``: the oldest queued audio frame is discarded
+    - ``merge``: the new audio is appended to the newest queued frame if it
+      is audio, so nothing is lost but fewer, larger messages are sent; after
+      a control frame (or a payload that is not valid base64) it starts a new
+      audio frame, keeping the order
+
+    Audio payloads are base64 and are wrapped by ``frame`` at send time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[str], Awaitable],
+        frame: Callable[[str], str],
+        maxsize: int = 50,
+        policy: str = "block"
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy {policy!r} (expected one of {QUEUE_POLICIES})")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self._send = send
+        self._frame = frame
+        self._items: Deque[Tuple[bool, str]] = deque()  # (is_audio, payload or message)
+        self._audio_count = 0
+        # Audio frames appended / sent or dropped so far, for on_audio_sent
+        self._audio_queued = 0
+        self._audio_done = 0
+        self._sent_watch: Optional[Tuple[int, Callable[[], None]]] = None
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._closed = False
+        self.error: Optional[str] = None
+
+        self.sent = 0
+        self.max_depth = 0
+        self.dropped = 0
+        self.merged = 0
+        self.merge_errors = 0  # Payloads that could not be merged (invalid base64)
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    async def put_audio(self, payload: str):
+        """Queue a base64 audio payload, applying the full-queue policy"""
+        self._check_open()
+        if self._audio_count >= self.maxsize:
+            if self.policy == "block":
+                self.blocked += 1
+                started = time.monotonic()
+                while self._audio_count >= self.maxsize and not self._closed:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+                self.blocked_seconds += time.monotonic() - started
+                self._check_open()
+            elif self.policy == "merge":
+                if self._merge_into_newest(payload):
+                    self.merged += 1
+                    return
+                # A control frame is at the tail, or a payload is not valid base64: queue
+                # past maxsize (by one frame each, since later audio merges into this one)
+            else:
+                self._drop_oldest_audio()
+                self.dropped += 1
+        self._append(True, payload)
+
+    def on_audio_sent(self, callback: Callable[[], None]):
+        """Call ``callback`` once the last queued audio frame has been sent (one-shot)"""
+        self._sent_watch = (self._audio_queued, callback)
+
+    async def put_message(self, message: str):
+        """Queue a control frame (never dropped or merged)"""
+        self._check_open()
+        self._append(False, message)
+
+    def close(self):
+        """Stop accepting frames; the writer exits once the queue is drained"""
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    async def run(self):
+        """Writer task: send queued frames in order until closed and drained"""
+        try:
+            while True:
+                while not self._items:
+                    if self._closed:
+                        return
+                    self._not_empty.clear()
+                    await self._not_empty.wait()
+                is_audio, value = self._items.popleft()
+                if is_audio:
+                    self._audio_count -= 1
+                    self._not_full.set()
+                await self._send(self._frame(value) if is_audio else value)
+                self.sent += 1
+                if is_audio:
+                    self._audio_done += 1
+                    if self._sent_watch is not None and self._audio_done >= self._sent_watch[0]:
+                        callback = self._sent_watch[1]
+                        self._sent_watch = None
+                        callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            logger.warning(f"{self.name} writer stopped: {self.error}")
+            self._items.clear()
+            self._audio_count = 0
+            self.close()
+
+    def _check_open(self):
+        if self._closed:
+            raise SendQueueClosed(f"{self.name} send queue closed" + (f": {self.error}" if self.error else ""))
+
+    def _append(self, is_audio: bool, value: str):
+        self._items.append((is_audio, value))
+        if is_audio:
+            self._audio_count += 1
+            self._audio_queued += 1
+        if len(self._items) > self.max_depth:
+            self.max_depth = len(self._items)
+        self._not_empty.set()
+
+    def _merge_into_newest(self, payload: str) -> bool:
+        # Only into an audio frame at the tail: audio must not move ahead of a
+        # mark or clear queued after it (playback tracking, barge-in)
+        if not self._items or not self._items[-1][0]:
+            return False
+        try:
+            merged = concat_base64([self._items[-1][1], payload])
+        except binascii.Error:
+            self.merge_errors += 1
+            return False
+        self._items[-1] = (True, merged)
+        return True
+
+    def _drop_oldest_audio(self):
+        for index, (is_audio, _) in enumerate(self._items):
+            if is_audio:
+                del self._items[index]
+                self._audio_count -= 1
+                self._audio_done += 1
+                return
+
+    def stats(self) -> Dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "merged": self.merged,
+            "merge_errors": self.merge_errors,
+            "blocked": self.blocked,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "error": self.error,
+        }
@@ -1,16 +1,18 @@
 """
 Utility for detecting transfer requests
 """
-from typing import List
+from typing import List, Union
 
+from .phrase_matcher import PhraseMatcher, get_matcher
 
-def should_transfer(text: str, keywords: List[str]) -> bool:
+
+def should_transfer(text: str, keywords: Union[PhraseMatcher, List[str]]) -> bool:
     """
     Check if user is requesting transfer to human
     
     Args:
         text: User's message
-        keywords: List of transfer keywords
+        keywords: Compiled PhraseMatcher, or a list of transfer keywords
     
     Returns:
         True if transfer requested, False otherwise
@@ -18,11 +20,5 @@ def should_transfer(text: str, keywords: List[str]) -> bool:
     if not text:
         return False
     
-    text_lower = text.lower().strip()
-    
-    # Check each keyword
-    for keyword in keywords:
-        if keyword in text_lower:
-            return True
-    
-    return False
+    matcher = keywords if isinstance(keywords, PhraseMatcher) else get_matcher(keywords)
+    return matcher.matches(text)
@@ -0,0 +1,112 @@
+"""
+Per-turn conversational latency
+
+Times each reply from the candidate's final transcript, on the monotonic
+clock: the agent_response text, the first agent audio chunk from ElevenLabs,
+the first byte of it sent to Twilio, and the last audio chunk of the reply.
+The transcript arrives once ElevenLabs has decided the candidate stopped
+talking, so this measures the pipeline from end-of-turn detection on.
+Finished turns are attached to the candidate's conversation entry (saved
+with the transcript) and observed into process-wide histograms.
+"""
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from .metrics import Histogram
+
+# Seconds from the candidate's transcript; finer around the 0.5-2 s that callers notice
+TURN_BUCKETS = (0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+TURN_STAGES = ("response_text", "first_audio", "first_forwarded", "completed")
+
+# Stage -> latency histogram over every traced turn in this process
+turn_latency: Dict[str, Histogram] = {stage: Histogram(TURN_BUCKETS) for stage in TURN_STAGES}
+
+
+class _Turn:
+    __slots__ = ("entry", "started", "response_text", "first_audio", "first_forwarded", "completed", "interrupted")
+
+    def __init__(self, entry: Dict, started: float):
+        self.entry = entry
+        self.started = started
+        self.response_text: Optional[float] = None
+        self.first_audio: Optional[float] = None
+        self.first_forwarded: Optional[float] = None
+        self.completed: Optional[float] = None  # Last agent audio chunk received so far
+        self.interrupted = False
+
+    def forwarded(self):
+        if self.first_forwarded is None:
+            self.first_forwarded = time.monotonic()
+
+
+class TurnTracer:
+    """Latency trace of one call's turns (candidate speaks, agent replies)"""
+
+    def __init__(self):
+        self._origin = time.monotonic()
+        self._turn: Optional[_Turn] = None
+        self.turns: List[Dict] = []
+
+    def user_transcript(self, entry: Dict):
+        """The candidate finished speaking; ``entry`` is their conversation entry"""
+        self.finish()
+        self._turn = _Turn(entry, time.monotonic())
+
+    def agent_response(self):
+        turn = self._turn
+        if turn is not None and turn.response_text is None:
+            turn.response_text = time.monotonic()
+
+    def agent_audio(self) -> Optional[Callable[[], None]]:
+        """
+        An agent audio chunk arrived
+
+        For the first chunk of a reply, returns the callback to run when it
+        has been sent to Twilio (see SendQueue.on_audio_sent); else None.
+        """
+        turn = self._turn
+        if turn is None:
+            return None
+        turn.completed = time.monotonic()
+        if turn.first_audio is None:
+            turn.first_audio = turn.completed
+            return turn.forwarded
+        return None
+
+    def interrupted(self):
+        """The candidate talked over the reply (ElevenLabs interruption event)"""
+        if self._turn is not None:
+            self._turn.interrupted = True
+
+    def finish(self):
+        """Close the current turn: store its trace and record its latencies"""
+        turn, self._turn = self._turn, None
+        if turn is None:
+            return
+        trace = {"at_ms": _ms(turn.started - self._origin)}
+        for stage in TURN_STAGES:
+            at = getattr(turn, stage)
+            if at is not None:
+                turn_latency[stage].observe(at - turn.started)
+            trace[f"{stage}_ms"] = _ms(at - turn.started) if at is not None else None
+        trace["interrupted"] = turn.interrupted
+        turn.entry["latency"] = trace
+        self.turns.append(trace)
+
+    def summary(self) -> Dict:
+        """Per-call latency to the first forwarded audio (replies only)"""
+        samples = [t["first_forwarded_ms"] for t in self.turns if t["first_forwarded_ms"] is not None]
+        if not samples:
+            return {"turns": len(self.turns)}
+        return {
+            "turns": len(self.turns),
+            "replies": len(samples),
+            "avg_ms": _ms(statistics.fmean(samples) / 1000),
+            "p50_ms": _ms(statistics.median(samples) / 1000),
+            "max_ms": _ms(max(samples) / 1000),
+        }
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
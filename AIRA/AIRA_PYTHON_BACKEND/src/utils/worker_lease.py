@@ -0,0 +1,104 @@
+"""
+Cross-process leases for singleton background tasks
+
+With several worker processes, each one imports the app and would start its
+own Node.js outbox sender and campaign dialer against the same SQLite files
+(double deliveries, a multiplied dial rate). A lease in a shared SQLite file
+lets exactly one worker run each of them; if that worker dies, its lease
+expires and another worker takes over.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS worker_leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class WorkerLease:
+    """
+    Named lease held by at most one process at a time
+
+    The holder renews it every ``ttl / 3`` seconds; a holder that stops
+    renewing (crashed, stuck) loses it after ``ttl``.
+    """
+
+    def __init__(self, db_path: Path, name: str, ttl: float = 15.0):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.held = False
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._task: Optional[asyncio.Task] = None
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; False if another live process holds it"""
+        now = time.time()
+        with self._lock:
+            # Upsert only if free, expired or already ours
+            updated = self._conn.execute(
+                "INSERT INTO worker_leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE worker_leases.owner = excluded.owner OR worker_leases.expires_at < ?",
+                (self.name, self.owner, now + self.ttl, now)
+            ).rowcount
+        return updated > 0
+
+    def release(self):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM worker_leases WHERE name = ? AND owner = ?", (self.name, self.owner)
+            )
+        self.held = False
+
+    def run(self, on_acquired: Callable[[], None], on_lost: Callable[[], Awaitable[None]]):
+        """Keep trying for the lease; start the task while held, stop it if lost"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(on_acquired, on_lost))
+
+    async def stop(self, on_lost: Callable[[], Awaitable[None]]):
+        """Stop the task if this process runs it, then hand the lease over"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.held:
+            await on_lost()
+            await asyncio.to_thread(self.release)
+
+    async def _run(self, on_acquired: Callable[[], None], on_lost: Callable[[], Awaitable[None]]):
+        while True:
+            try:
+                acquired = await asyncio.to_thread(self.try_acquire)
+            except sqlite3.Error as e:
+                logger.error(f"Lease {self.name}: {e}")
+                acquired = False
+
+            if acquired and not self.held:
+                self.held = True
+                logger.info(f"Lease {self.name} acquired by worker {os.getpid()}")
+                on_acquired()
+            elif not acquired and self.held:
+                self.held = False
+                logger.warning(f"Lease {self.name} lost by worker {os.getpid()} - stopping")
+                await on_lost()
+            await asyncio.sleep(self.ttl / 3)